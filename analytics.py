@@ -0,0 +1,224 @@
+"""Gameplay heatmaps over many runs: where players hop, pass, collect and die.
+
+    python analytics.py --runs 100000 [--workers 4] [--out analytics.npz]
+    python analytics.py --show analytics.npz
+    python main.py --analytics analytics.npz   # add live games to the file
+
+Events are binned into fixed-size count arrays, so memory stays constant no
+matter how many runs are added. Aggregates merge by addition: workers fill
+their own and the parent sums them, and --out adds to an existing file.
+Positions are binned by the fraction of the viewport width, so games with
+different viewports merge too.
+
+Arrays (laneType, cause and difficulty are indices into LANE_TYPES,
+DEATH_CAUSES and difficulty bins of DIFFICULTY_STEP):
+- hops[laneType, difficulty, column]: hops landed
+- rowsPassed[laneType, difficulty]: new rows reached
+- coins[laneType, difficulty, column]: coins collected
+- deaths[cause, laneType, difficulty, column]: where players died
+- deathContext[cause, laneBelow, laneType, laneAbove]: lane-type pattern
+  around each death (getLaneType's output)
+- deathTreesBelow[cause, trees]: trees on the grass row below each death
+  (generateTrees' output; a blocked retreat)
+- runScores[scoreBin]: final scores, SCORE_STEP points per bin
+- runs[0]: finished runs, runs[1]: runs cut off at MAX_RUN_FRAMES
+"""
+import argparse
+import multiprocessing
+import os
+
+import numpy as np
+
+import main
+from main import (
+    GRASS, LANE_TYPES, DEATH_CAUSES,
+    EVENT_HOP, EVENT_ROW_PASSED, EVENT_COIN, EVENT_DEATH,
+    getLaneAtY, getLaneByRow, subscribe,
+)
+
+HEATMAP_COLUMNS = 8
+DIFFICULTY_STEP = 0.25
+DIFFICULTY_BINS = 8  # Difficulty runs from 1.0 to 3.0
+MAX_TREES = 8
+SCORE_STEP = 5
+SCORE_BINS = 64  # The last bin collects every higher score
+MAX_RUN_FRAMES = 30 * 60 * 5  # Bot runs are cut off after 5 minutes
+RUNS_PER_TASK = 100
+
+LANE_COUNT = len(LANE_TYPES)
+CAUSE_COUNT = len(DEATH_CAUSES)
+LANE_INDEX = {laneType: i for i, laneType in enumerate(LANE_TYPES)}
+CAUSE_INDEX = {cause: i for i, cause in enumerate(DEATH_CAUSES)}
+
+AGGREGATE_SHAPES = {
+    'hops': (LANE_COUNT, DIFFICULTY_BINS, HEATMAP_COLUMNS),
+    'rowsPassed': (LANE_COUNT, DIFFICULTY_BINS),
+    'coins': (LANE_COUNT, DIFFICULTY_BINS, HEATMAP_COLUMNS),
+    'deaths': (CAUSE_COUNT, LANE_COUNT, DIFFICULTY_BINS, HEATMAP_COLUMNS),
+    'deathContext': (CAUSE_COUNT, LANE_COUNT, LANE_COUNT, LANE_COUNT),
+    'deathTreesBelow': (CAUSE_COUNT, MAX_TREES + 1),
+    'runScores': (SCORE_BINS,),
+    'runs': (2,),
+}
+
+# ============================================================================
+# AGGREGATES
+# ============================================================================
+def newAggregates():
+    """Empty count arrays for every heatmap and histogram."""
+    return {name: np.zeros(shape, dtype=np.int64) for name, shape in AGGREGATE_SHAPES.items()}
+
+def mergeAggregates(into, other):
+    """Add other's counts into `into` (and return it)."""
+    for name in AGGREGATE_SHAPES:
+        into[name] += other[name]
+    return into
+
+def saveAggregates(aggregates, path):
+    """Write aggregates to an .npz file (atomically)."""
+    tempPath = path + '.tmp.npz'
+    np.savez_compressed(tempPath, **aggregates)
+    os.replace(tempPath, path)
+
+def loadAggregates(path):
+    """Read aggregates from an .npz file (empty ones if it doesn't exist)."""
+    aggregates = newAggregates()
+    if os.path.exists(path):
+        with np.load(path) as data:
+            for name in AGGREGATE_SHAPES:
+                if name in data:
+                    aggregates[name] += data[name]
+    return aggregates
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+def attach(app, aggregates):
+    """Record app's gameplay events into aggregates."""
+    for event in (EVENT_HOP, EVENT_ROW_PASSED, EVENT_COIN, EVENT_DEATH):
+        subscribe(app, event, lambda app, value, event=event:
+                  recordEvent(aggregates, app, event, value))
+
+def attachToFile(app, path):
+    """Add live games to an .npz file, saving after every death."""
+    aggregates = loadAggregates(path)
+    attach(app, aggregates)
+    subscribe(app, EVENT_DEATH, lambda app, cause: saveAggregates(aggregates, path))
+
+def recordEvent(aggregates, app, event, value):
+    """Bin one gameplay event."""
+    difficulty = min(DIFFICULTY_BINS - 1, int((app.difficultyMultiplier - 1) / DIFFICULTY_STEP))
+    if event == EVENT_ROW_PASSED:
+        lane = getLaneAtY(app, value)
+        if lane is not None:
+            aggregates['rowsPassed'][LANE_INDEX[lane['type']], difficulty] += 1
+        return
+
+    lane = getLaneAtY(app, app.playerY)
+    if lane is None:
+        return
+    laneType = LANE_INDEX[lane['type']]
+    column = getColumn(app.playerX)
+
+    if event == EVENT_HOP:
+        aggregates['hops'][laneType, difficulty, column] += 1
+    elif event == EVENT_COIN:
+        aggregates['coins'][laneType, difficulty, column] += 1
+    elif event == EVENT_DEATH:
+        cause = CAUSE_INDEX[value]
+        aggregates['deaths'][cause, laneType, difficulty, column] += 1
+        below = getLaneByRow(app, lane['row'] - 1)
+        above = getLaneByRow(app, lane['row'] + 1)
+        # Missing neighbours (off the generated world) count as grass
+        belowType = LANE_INDEX[below['type']] if below else 0
+        aboveType = LANE_INDEX[above['type']] if above else 0
+        aggregates['deathContext'][cause, belowType, laneType, aboveType] += 1
+        trees = 0
+        if below is not None and below['type'] == GRASS:
+            trees = min(MAX_TREES, len(below['obstacles']))
+        aggregates['deathTreesBelow'][cause, trees] += 1
+        aggregates['runScores'][min(SCORE_BINS - 1, app.score // SCORE_STEP)] += 1
+        aggregates['runs'][0] += 1
+
+def getColumn(x):
+    """Heatmap column for an x position (drifting off-screen counts as the edge)."""
+    return min(HEATMAP_COLUMNS - 1, max(0, int(x * HEATMAP_COLUMNS / main.CANVAS_WIDTH)))
+
+# ============================================================================
+# HEADLESS BATCHES
+# ============================================================================
+def runBatch(seeds):
+    """Play one bot run per seed and return the aggregates."""
+    aggregates = newAggregates()
+    app = main.createHeadlessApp(seeds[0])
+    attach(app, aggregates)
+    for seed in seeds:
+        main.resetGame(app, seed)
+        for _ in range(MAX_RUN_FRAMES):
+            key = main.chooseBotKey(app)
+            if key is not None:
+                main.onKeyPress(app, key)
+            main.onStep(app)
+            if app.gameState != 'playing':
+                break
+        else:
+            aggregates['runs'][1] += 1
+    return aggregates
+
+def runBatches(runs, firstSeed=0, workers=None):
+    """Play `runs` bot runs on worker processes and merge their aggregates."""
+    tasks = [list(range(start, min(start + RUNS_PER_TASK, firstSeed + runs)))
+             for start in range(firstSeed, firstSeed + runs, RUNS_PER_TASK)]
+    total = newAggregates()
+    with multiprocessing.Pool(workers) as pool:
+        for done, aggregates in enumerate(pool.imap_unordered(runBatch, tasks), 1):
+            mergeAggregates(total, aggregates)
+            print(f'\r{min(done * RUNS_PER_TASK, runs)}/{runs} runs', end='', flush=True)
+    print()
+    return total
+
+# ============================================================================
+# REPORT
+# ============================================================================
+def printReport(aggregates):
+    """Summarize which lane types and patterns kill players."""
+    finished, cutOff = aggregates['runs']
+    print(f'{finished} runs ended in death, {cutOff} were cut off')
+    deaths = aggregates['deaths'].sum(axis=(2, 3))  # [cause, laneType]
+    passed = aggregates['rowsPassed'].sum(axis=1)
+
+    print('\nDeaths per 100 rows reached, by lane type:')
+    for laneType, name in enumerate(LANE_TYPES):
+        rate = 100 * deaths[:, laneType].sum() / max(1, passed[laneType])
+        causes = ', '.join(f'{cause} {deaths[c, laneType]}' for c, cause in enumerate(DEATH_CAUSES)
+                           if deaths[c, laneType])
+        print(f'  {name:6} {rate:6.2f}  ({causes or "none"})')
+
+    print('\nDeadliest lane patterns (below / death lane / above):')
+    context = aggregates['deathContext'].sum(axis=0)
+    for index in np.argsort(context, axis=None)[::-1][:5]:
+        below, laneType, above = np.unravel_index(index, context.shape)
+        if context[below, laneType, above]:
+            print(f'  {LANE_TYPES[below]:6} / {LANE_TYPES[laneType]:6} / {LANE_TYPES[above]:6}'
+                  f'  {context[below, laneType, above]}')
+
+    print('\nDeaths by trees on the grass row below:')
+    trees = aggregates['deathTreesBelow'].sum(axis=0)
+    print('  ' + '  '.join(f'{count}: {trees[count]}' for count in range(MAX_TREES + 1) if trees[count]))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gameplay heatmaps from headless bot runs.')
+    parser.add_argument('--runs', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0, help='first seed')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='analytics.npz', help='file to add the results to')
+    parser.add_argument('--show', metavar='FILE', help='only print the report for a file')
+    args = parser.parse_args()
+
+    if args.show:
+        printReport(loadAggregates(args.show))
+    else:
+        aggregates = mergeAggregates(loadAggregates(args.out),
+                                     runBatches(args.runs, args.seed, args.workers))
+        saveAggregates(aggregates, args.out)
+        printReport(aggregates)
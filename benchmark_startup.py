@@ -0,0 +1,63 @@
+"""Cold-start benchmark for the game.
+
+Each sample runs in a fresh interpreter so nothing is cached in-process:
+
+    python benchmark_startup.py            # headless: import + world generation
+    python benchmark_startup.py --window   # also time the windowed game
+
+The windowed run uses `main.py --startup-benchmark`, which prints the
+STARTUP_TIMES milestones (import, graphics, world, firstFrame,
+firstInteractive) as JSON and quits on the first step.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SAMPLES = 5
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HEADLESS_PROBE = """
+import json, sys, time
+begin = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.createHeadlessApp(seed=0)
+ready = time.perf_counter()
+print(json.dumps({
+    'import': imported - begin,
+    'world': ready - begin,
+    'graphicsImported': 'cmu_graphics' in sys.modules,
+}))
+"""
+
+def runSample(args):
+    """Run one fresh interpreter and return its JSON timing line."""
+    result = subprocess.run([sys.executable] + args, cwd=HERE, capture_output=True,
+                            text=True, timeout=120)
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(f'no timing output from {args}:\n{result.stdout}{result.stderr}')
+
+def report(title, samples):
+    """Print the median of each milestone, in milliseconds."""
+    print(title)
+    for name in samples[0]:
+        values = [sample[name] for sample in samples]
+        if isinstance(values[0], bool):
+            print(f'  {name:18} {values[0]}')
+        else:
+            print(f'  {name:18} {statistics.median(values) * 1000:8.1f} ms')
+
+def main():
+    headless = [runSample(['-c', HEADLESS_PROBE]) for _ in range(SAMPLES)]
+    report(f'Headless (median of {SAMPLES})', headless)
+
+    if '--window' in sys.argv:
+        windowed = [runSample(['main.py', '--startup-benchmark']) for _ in range(SAMPLES)]
+        report(f'Windowed (median of {SAMPLES})', windowed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""Record games to animated GIF, APNG or a raw video pipe, one frame at a time.
+
+    python main.py --capture run.png [--capture-every 2]       # live game
+    python capture.py clip.gif --seed 7 --frames 3000 --every 3  # headless bot
+    python capture.py clip.png --snapshot saved.crs --skip 600    # from a snapshot
+    python capture.py '|ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height}
+        -r {fps} -i - clip.mp4' --seed 7
+
+Frames are rendered with framebuffer.py (palette indices, so GIF and APNG
+need no color quantizing) and handed to an encoder thread through a short
+queue. If the encoder falls behind, frames are dropped rather than stalling
+the game, and the previous frame is shown for longer so the clip keeps real
+time. Every frame is written out as soon as the next one arrives, so memory
+use doesn't grow with the length of the recording.
+
+Targets ending in .gif are written as GIF (needs Pillow for the LZW
+encoder), .png/.apng as APNG, and '|COMMAND' pipes raw RGB frames to a
+command, with {width}, {height} and {fps} filled in.
+"""
+import argparse
+import atexit
+import contextlib
+import queue
+import shlex
+import struct
+import subprocess
+import threading
+import time
+import zlib
+
+import numpy as np
+
+import main
+from framebuffer import PALETTE_RGB, newFramebuffer, renderFrame
+
+GAME_FPS = 30  # app.stepsPerSecond
+CAPTURE_QUEUE = 8  # Frames waiting for the encoder before new ones are dropped
+PNG_COMPRESSION = 6
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+class GifWriter:
+    """Animated GIF with the framebuffer palette as the global color table."""
+
+    def __init__(self, path, width, height):
+        from PIL import GifImagePlugin, Image
+        self.getdata = GifImagePlugin.getdata
+        self.fromarray = Image.fromarray
+        self.file = open(path, 'wb')
+        self.elapsed = 0  # Game frames written so far, for rounding delays
+
+        bits = max(1, (len(PALETTE_RGB) - 1).bit_length())
+        colors = np.zeros((1 << bits, 3), dtype=np.uint8)
+        colors[:len(PALETTE_RGB)] = PALETTE_RGB
+        self.palette = colors.tobytes()
+        self.file.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0x80 | (bits - 1), 0, 0))
+        self.file.write(self.palette)
+        self.file.write(b'!\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00')  # Loop forever
+
+    def writeFrame(self, pixels, frames):
+        """Write palette-index pixels shown for `frames` game frames."""
+        # GIF delays are in centiseconds: round the running total, not each delay
+        start = round(self.elapsed * 100 / GAME_FPS)
+        self.elapsed += frames
+        delay = round(self.elapsed * 100 / GAME_FPS) - start
+        image = self.fromarray(pixels, 'P')
+        image.putpalette(self.palette)
+        for chunk in self.getdata(image, duration=delay * 10):
+            self.file.write(chunk)
+
+    def close(self):
+        self.file.write(b';')
+        self.file.close()
+
+class ApngWriter:
+    """Animated PNG (palette color type); the frame count is patched in on close."""
+
+    ACTL_OFFSET = 33  # Signature (8) + IHDR chunk (25)
+
+    def __init__(self, path, width, height):
+        self.file = open(path, 'wb')
+        self.width = width
+        self.height = height
+        self.frames = 0
+        self.sequence = 0
+        # Each scanline starts with a filter type byte (0 = none)
+        self.rows = np.zeros((height, width + 1), dtype=np.uint8)
+
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self.chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0))
+        self.chunk(b'acTL', struct.pack('>II', 0, 0))  # Frame count, loop forever
+        self.chunk(b'PLTE', PALETTE_RGB.tobytes())
+
+    def chunk(self, kind, data):
+        self.file.write(struct.pack('>I', len(data)) + kind + data +
+                        struct.pack('>I', zlib.crc32(kind + data)))
+
+    def writeFrame(self, pixels, frames):
+        """Write palette-index pixels shown for `frames` game frames."""
+        self.chunk(b'fcTL', struct.pack('>IIIIIHHBB', self.sequence, self.width, self.height,
+                                        0, 0, frames, GAME_FPS, 0, 0))
+        self.sequence += 1
+        self.rows[:, 1:] = pixels
+        data = zlib.compress(self.rows.tobytes(), PNG_COMPRESSION)
+        if self.frames == 0:
+            self.chunk(b'IDAT', data)  # The first frame doubles as the still image
+        else:
+            self.chunk(b'fdAT', struct.pack('>I', self.sequence) + data)
+            self.sequence += 1
+        self.frames += 1
+
+    def close(self):
+        self.chunk(b'IEND', b'')
+        self.file.seek(self.ACTL_OFFSET)
+        self.chunk(b'acTL', struct.pack('>II', self.frames, 0))
+        self.file.close()
+
+class PipeWriter:
+    """Raw RGB24 frames at a constant rate on a command's stdin (e.g. ffmpeg)."""
+
+    def __init__(self, command, width, height, fps):
+        args = shlex.split(command.format(width=width, height=height, fps=fps))
+        self.process = subprocess.Popen(args, stdin=subprocess.PIPE)
+        self.frameFrames = GAME_FPS / fps  # Game frames per output frame
+        self.elapsed = 0.0
+        self.written = 0
+
+    def writeFrame(self, pixels, frames):
+        """Write the frame as often as it takes to cover `frames` game frames."""
+        self.elapsed += frames
+        data = PALETTE_RGB[pixels].tobytes()
+        while self.written < round(self.elapsed / self.frameFrames):
+            self.process.stdin.write(data)
+            self.written += 1
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+def openWriter(target, width, height, fps):
+    """Writer for a '|COMMAND', .gif or .png/.apng target."""
+    if target.startswith('|'):
+        return PipeWriter(target[1:], width, height, fps)
+    if target.lower().endswith('.gif'):
+        return GifWriter(target, width, height)
+    if target.lower().endswith(('.png', '.apng')):
+        return ApngWriter(target, width, height)
+    raise ValueError(f'capture target must end in .gif, .png or .apng or start with |, not {target!r}')
+
+# ============================================================================
+# RECORDER
+# ============================================================================
+class Recorder:
+    """Renders every `every`th frame after `skip` and encodes them on a worker thread."""
+
+    def __init__(self, target, width=None, height=None, every=1, skip=0, maxFrames=None,
+                 dropFrames=True):
+        width = width or main.CANVAS_WIDTH
+        height = height or main.CANVAS_HEIGHT
+        self.framebuffer = newFramebuffer(width, height, mode='palette')
+        self.writer = openWriter(target, width, height, GAME_FPS / every)
+        self.every = every
+        self.skip = skip
+        self.maxFrames = maxFrames
+        self.dropFrames = dropFrames  # Off for headless runs, which can wait
+        self.frame = 0  # Game frames seen
+        self.captured = 0
+        self.dropped = 0
+        self.queue = queue.Queue(CAPTURE_QUEUE)
+        self.error = None  # Set if the encoder thread failed (raised again by capture/close)
+        self.thread = threading.Thread(target=self.encode, name='capture', daemon=True)
+        self.thread.start()
+
+    def capture(self, app):
+        """Call once per game frame; renders and queues the frame if it is due."""
+        if self.error is not None:
+            raise self.error
+        frame = self.frame - self.skip
+        self.frame += 1
+        if frame < 0 or frame % self.every or self.closed():
+            return
+        pixels = renderFrame(app, self.framebuffer, drawUI=True).copy()
+        if not self.dropFrames:
+            self.put((frame, pixels))
+            self.captured += 1
+            return
+        try:
+            self.queue.put_nowait((frame, pixels))
+            self.captured += 1
+        except queue.Full:
+            self.dropped += 1  # The previous frame stays up longer instead
+
+    def put(self, item):
+        """Wait for room in the queue, unless the encoder thread has died."""
+        while True:
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if not self.thread.is_alive():
+                    raise self.error or RuntimeError('capture encoder stopped')
+
+    def closed(self):
+        return self.maxFrames is not None and self.captured >= self.maxFrames
+
+    def encode(self):
+        """Encoder thread: write each frame once the next one says how long it lasts."""
+        try:
+            previous = None
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                if previous is not None:
+                    self.writer.writeFrame(previous[1], item[0] - previous[0])
+                previous = item
+            if previous is not None:
+                self.writer.writeFrame(previous[1], self.every)
+            self.writer.close()
+        except Exception as error:
+            # e.g. BrokenPipeError when an encoder command exits early
+            self.error = error
+            with contextlib.suppress(Exception):
+                self.writer.close()
+
+    def close(self):
+        """Finish the file (waits for queued frames to be encoded)."""
+        if self.thread.is_alive():
+            with contextlib.suppress(Exception):
+                self.put(None)  # A failed encoder leaves its error to report below
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+def startRecorder(app, target, every=1):
+    """Record a live game; the file is finished when the program exits."""
+    recorder = Recorder(target, every=every)
+    main.subscribe(app, main.EVENT_STEP, lambda app, value: recorder.capture(app))
+    atexit.register(recorder.close)
+    return recorder
+
+# ============================================================================
+# HEADLESS CAPTURE
+# ============================================================================
+def captureHeadless(target, seed=None, snapshot=None, frames=3000, **options):
+    """Let the bot play (from a seed or snapshot file) and record it.
+
+    Returns (recorder, seconds spent per frame on the game thread)."""
+    app = main.createHeadlessApp(seed)
+    if snapshot is not None:
+        with open(snapshot, 'rb') as f:
+            main.restoreSnapshot(app, f.read())
+    recorder = Recorder(target, dropFrames=False, **options)
+    started = time.perf_counter()
+    for _ in range(frames):
+        key = main.chooseBotKey(app)
+        if key is not None:
+            main.onKeyPress(app, key)
+        main.onStep(app)
+        recorder.capture(app)
+        if app.gameState != 'playing' or recorder.closed():
+            break
+    elapsed = time.perf_counter() - started
+    recorder.close()
+    return recorder, elapsed / max(1, recorder.frame)
+
+def positiveInt(text):
+    """argparse type for counts that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, not {value}')
+    return value
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record a headless bot game.')
+    parser.add_argument('target', help='.gif, .png/.apng, or |COMMAND for raw RGB frames')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--snapshot', help='start from a main.saveSnapshot file')
+    parser.add_argument('--frames', type=positiveInt, default=3000, help='game frames to play')
+    parser.add_argument('--every', type=int, default=1, help='keep every Nth frame')
+    parser.add_argument('--skip', type=int, default=0, help='game frames to skip first')
+    parser.add_argument('--max-frames', type=int, default=None, help='stop after N captured frames')
+    parser.add_argument('--size', default=None, help='WIDTHxHEIGHT of the recording')
+    args = parser.parse_args()
+
+    width = height = None
+    if args.size:
+        width, height = map(int, args.size.split('x'))
+    recorder, frameTime = captureHeadless(
+        args.target, args.seed, args.snapshot, args.frames, width=width, height=height,
+        every=args.every, skip=args.skip, maxFrames=args.max_frames)
+    print(f'{recorder.captured} frames captured, {recorder.dropped} dropped, '
+          f'{frameTime * 1e3:.2f} ms per game frame')
@@ -0,0 +1,167 @@
+"""Gym-style environment API for non-pixel agents.
+
+    env = CrossyRoadEnv()
+    obs = env.reset(seed=0)
+    obs, reward, done, info = env.step(UP)
+
+Observations have a fixed shape:
+- obs['grid']: int8 array (OBS_ROWS_AHEAD + 1 + OBS_ROWS_BEHIND, OBS_COLS, 3).
+  Row 0 is the furthest row ahead; row OBS_ROWS_AHEAD is the player's row.
+  Columns are the 50px grid columns. The channels per cell are
+  [lane type code, occupant code, obstacle velocity in px/frame].
+- obs['player']: int16 array [x, isHopping, hopFrame, onLog, facing].
+
+reset() and step() return fresh arrays, so observations can be kept (e.g. in
+a replay buffer). With copy=False they return the env's own arrays instead,
+which the next call overwrites (rollout.py uses this to observe straight
+into shared memory).
+"""
+import numpy as np
+
+from main import (
+    CANVAS_WIDTH, GRID_SIZE, LANE_HEIGHT, GRASS, ROAD, WATER, RAIL,
+    createHeadlessApp, resetGame, onStep, onKeyPress,
+)
+
+# Actions
+NOOP = 0
+UP = 1
+DOWN = 2
+LEFT = 3
+RIGHT = 4
+ACTION_KEYS = (None, 'up', 'down', 'left', 'right')
+
+# Observation layout
+OBS_ROWS_AHEAD = 8
+OBS_ROWS_BEHIND = 3
+OBS_ROWS = OBS_ROWS_AHEAD + 1 + OBS_ROWS_BEHIND
+OBS_COLS = CANVAS_WIDTH // GRID_SIZE
+GRID_SHAPE = (OBS_ROWS, OBS_COLS, 3)
+PLAYER_SHAPE = (5,)
+
+# Channel 0: lane type (0 = no lane)
+LANE_CODES = {GRASS: 1, ROAD: 2, WATER: 3, RAIL: 4}
+RAIL_WARNING_CODE = 5  # Rail lane with a train on the way
+
+# Channel 1: occupant
+OCCUPANT_CODES = {'tree': 1, 'car': 2, 'log': 3, 'train': 4}
+
+# Rewards
+ROW_REWARD = 1.0
+COIN_REWARD = 0.5
+DEATH_PENALTY = -1.0
+
+class CrossyRoadEnv:
+    """Headless game with reset(seed) / step(action) -> obs, reward, done, info."""
+
+    def __init__(self, frameSkip=1, copy=True):
+        self.frameSkip = frameSkip
+        self.copy = copy  # Return copies of the observation arrays (see module docstring)
+        self.app = None
+        self.grid = np.zeros(GRID_SHAPE, dtype=np.int8)
+        self.player = np.zeros(PLAYER_SHAPE, dtype=np.int16)
+        # Encoded lane type/velocity/tree rows, keyed by world row index.
+        # Lanes never change type or speed, so each row is encoded once.
+        self._staticRows = {}
+
+    def reset(self, seed=None):
+        """Start a new game and return the first observation."""
+        if self.app is None:
+            self.app = createHeadlessApp(seed)
+        else:
+            resetGame(self.app, seed)
+        self._staticRows.clear()
+        return self._result(self._observe())
+
+    def step(self, action):
+        """Apply an action for frameSkip frames."""
+        app = self.app
+        if app.gameState != 'playing':
+            raise RuntimeError('step() called after the game ended; call reset()')
+
+        score = app.score
+        coins = app.coinCount
+
+        key = ACTION_KEYS[action]
+        if key is not None:
+            onKeyPress(app, key)
+        for _ in range(self.frameSkip):
+            onStep(app)
+            if app.gameState != 'playing':
+                break
+
+        done = app.gameState != 'playing'
+        reward = (ROW_REWARD * (app.score - score) +
+                  COIN_REWARD * (app.coinCount - coins))
+        if done:
+            reward += DEATH_PENALTY
+        info = {'score': app.score, 'coins': app.coinCount, 'seed': app.seed}
+        return self._result(self._observe()), reward, done, info
+
+    def _result(self, obs):
+        """The observation as returned to callers (copied unless copy=False)."""
+        if not self.copy:
+            return obs
+        return {'grid': obs['grid'].copy(), 'player': obs['player'].copy()}
+
+    def _observe(self):
+        """Fill the observation arrays from the lanes around the player."""
+        app = self.app
+        lanes = app.lanes
+        grid = self.grid
+        grid.fill(0)
+
+        # Lanes are stored bottom to top, one per LANE_HEIGHT
+        playerIndex = None
+        for i, lane in enumerate(lanes):
+            if lane['y'] <= app.playerY <= lane['y'] + LANE_HEIGHT:
+                playerIndex = i
+                break
+
+        if playerIndex is not None:
+            firstRow = lanes[0]['row']
+            for row in [r for r in self._staticRows if r < firstRow]:
+                del self._staticRows[row]
+
+            for gridRow in range(OBS_ROWS):
+                laneIndex = playerIndex + OBS_ROWS_AHEAD - gridRow
+                if 0 <= laneIndex < len(lanes):
+                    self._encodeLane(lanes[laneIndex], grid[gridRow])
+
+        player = self.player
+        player[0] = round(app.playerX)
+        player[1] = app.isHopping
+        player[2] = app.hopFrame
+        player[3] = app.playerOnLog is not None
+        player[4] = app.playerFacing
+        return {'grid': grid, 'player': player}
+
+    def _encodeLane(self, lane, cells):
+        """Encode one lane into a (OBS_COLS, 3) slice of the grid."""
+        static = self._staticRows.get(lane['row'])
+        if static is None:
+            static = np.zeros((OBS_COLS, 3), dtype=np.int8)
+            static[:, 0] = LANE_CODES[lane['type']]
+            static[:, 2] = max(-127, min(127, round(lane['speed'] * lane['direction'])))
+            if lane['type'] == GRASS:
+                self._fillOccupants(lane, static)
+            self._staticRows[lane['row']] = static
+
+        cells[:] = static
+        if lane['type'] == GRASS:
+            return
+        if lane['trainWarning']:
+            cells[:, 0] = RAIL_WARNING_CODE
+        self._fillOccupants(lane, cells)
+
+    @staticmethod
+    def _fillOccupants(lane, cells):
+        """Mark the columns covered by each obstacle in the lane."""
+        for obs in lane['obstacles']:
+            left = obs['x'] - obs['width'] / 2
+            right = obs['x'] + obs['width'] / 2
+            if right <= 0 or left >= CANVAS_WIDTH:
+                continue
+            first = max(0, int(left // GRID_SIZE))
+            last = min(OBS_COLS - 1, int((right - 1) // GRID_SIZE))
+            cells[first:last + 1, 1] = OCCUPANT_CODES[obs['type']]
@@ -0,0 +1,329 @@
+"""Offscreen NumPy renderer for the Crossy Road scene.
+
+Draws the same scene as main.redrawAll (lanes, obstacles, coins, player and
+optionally the UI) into a NumPy array, without a window or cmu_graphics.
+Everything is drawn as palette indices and converted to RGB or grayscale at
+the end, so frames can be produced at any (downscaled) resolution, e.g.
+
+    fb = newFramebuffer(84, 126, mode='gray')
+    frame = renderFrame(app, fb)
+"""
+import math
+
+import numpy as np
+
+from main import (
+    CANVAS_WIDTH, CANVAS_HEIGHT, LANE_HEIGHT, PALETTE,
+    GRASS, ROAD, WATER, RAIL,
+)
+
+# Colors drawn inline with rgb()/color names in main.py
+EXTRA_COLORS = {
+    'sky': (135, 206, 235),
+    'silver': (192, 192, 192),
+    'gray': (128, 128, 128),
+    'dimGray': (105, 105, 105),
+    'darkRed': (139, 0, 0),
+    'red': (255, 0, 0),
+    'white': (255, 255, 255),
+    'black': (0, 0, 0),
+    'window': (180, 220, 255),
+    'wheel': (40, 40, 40),
+    'trainWindow': (255, 255, 200),
+    'loco': (70, 70, 80),
+    'locoDark': (50, 50, 60),
+    'coin': (255, 215, 0),
+    'coinEdge': (180, 140, 20),
+    'beak': (255, 140, 50),
+    'hudBox': (250, 250, 250),
+    'hudText': (50, 50, 50),
+    'hudGold': (140, 100, 20),
+    'gameOverRed': (220, 70, 70),
+    'restartGreen': (100, 180, 100),
+}
+
+PALETTE_NAMES = list(PALETTE) + list(EXTRA_COLORS)
+COLOR_INDEX = {name: i for i, name in enumerate(PALETTE_NAMES)}
+PALETTE_RGB = np.array([PALETTE.get(name) or EXTRA_COLORS[name] for name in PALETTE_NAMES],
+                       dtype=np.uint8)
+# ITU-R 601 luma, the usual grayscale for pixel observations
+PALETTE_GRAY = (PALETTE_RGB @ np.array([0.299, 0.587, 0.114])).round().astype(np.uint8)
+
+FRAME_MODES = ('rgb', 'gray', 'palette')
+
+# 3x5 bitmap digits for the HUD counters
+DIGIT_FONT = {
+    '0': ('111', '101', '101', '101', '111'),
+    '1': ('010', '110', '010', '010', '111'),
+    '2': ('111', '001', '111', '100', '111'),
+    '3': ('111', '001', '111', '001', '111'),
+    '4': ('101', '101', '111', '001', '001'),
+    '5': ('111', '100', '111', '001', '111'),
+    '6': ('111', '100', '111', '101', '111'),
+    '7': ('111', '001', '001', '001', '001'),
+    '8': ('111', '101', '111', '101', '111'),
+    '9': ('111', '101', '111', '001', '111'),
+}
+
+# ============================================================================
+# FRAMEBUFFER SETUP
+# ============================================================================
+def newFramebuffer(width=CANVAS_WIDTH, height=CANVAS_HEIGHT, mode='rgb'):
+    """Create a framebuffer that renders the canvas scaled to width x height."""
+    if mode not in FRAME_MODES:
+        raise ValueError(f'mode must be one of {FRAME_MODES}, not {mode!r}')
+
+    scaleX = width / CANVAS_WIDTH
+    scaleY = height / CANVAS_HEIGHT
+
+    # Pixel centers in canvas coordinates, used for ellipse masks
+    xs = (np.arange(width) + 0.5) / scaleX
+    ys = (np.arange(height) + 0.5) / scaleY
+
+    # Repeating lane decorations become column masks, so each is one fill
+    roadDashCols = (xs % 50 >= 10) & (xs % 50 < 35)
+    railTieCols = xs % 30 < 18
+
+    return {
+        'width': width,
+        'height': height,
+        'mode': mode,
+        'scaleX': scaleX,
+        'scaleY': scaleY,
+        'xs': xs,
+        'ys': ys,
+        'roadDashCols': roadDashCols,
+        'railTieCols': railTieCols,
+        'pixels': np.zeros((height, width), dtype=np.uint8),
+    }
+
+# ============================================================================
+# PRIMITIVES
+# ============================================================================
+def fillRect(fb, x, y, w, h, color):
+    """Fill a canvas-space rectangle with a palette color."""
+    x0 = max(0, round(x * fb['scaleX']))
+    x1 = min(fb['width'], round((x + w) * fb['scaleX']))
+    y0 = max(0, round(y * fb['scaleY']))
+    y1 = min(fb['height'], round((y + h) * fb['scaleY']))
+    if x0 < x1 and y0 < y1:
+        fb['pixels'][y0:y1, x0:x1] = COLOR_INDEX[color]
+
+def fillBand(fb, y, h, color, colMask=None):
+    """Fill a full-width band, optionally only in the columns of colMask."""
+    y0 = max(0, round(y * fb['scaleY']))
+    y1 = min(fb['height'], round((y + h) * fb['scaleY']))
+    if y0 >= y1:
+        return
+    if colMask is None:
+        fb['pixels'][y0:y1] = COLOR_INDEX[color]
+    else:
+        fb['pixels'][y0:y1, colMask] = COLOR_INDEX[color]
+
+def fillOval(fb, cx, cy, w, h, color):
+    """Fill a canvas-space ellipse centered at (cx, cy) with a palette color."""
+    scaleX = fb['scaleX']
+    scaleY = fb['scaleY']
+    x0 = max(0, int((cx - w / 2) * scaleX))
+    x1 = min(fb['width'], int((cx + w / 2) * scaleX) + 1)
+    y0 = max(0, int((cy - h / 2) * scaleY))
+    y1 = min(fb['height'], int((cy + h / 2) * scaleY) + 1)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    dx = (fb['xs'][x0:x1] - cx) * (2 / w)
+    dy = (fb['ys'][y0:y1] - cy) * (2 / h)
+    mask = dy[:, None] ** 2 + dx[None, :] ** 2 <= 1
+    fb['pixels'][y0:y1, x0:x1][mask] = COLOR_INDEX[color]
+
+def fillNumber(fb, value, cx, cy, cellSize, color):
+    """Draw a non-negative integer with the bitmap digit font, centered."""
+    text = str(value)
+    glyphWidth = 4 * cellSize  # 3 cells plus one of spacing
+    left = cx - (len(text) * glyphWidth - cellSize) / 2
+    top = cy - 2.5 * cellSize
+    for i, digit in enumerate(text):
+        for row, bits in enumerate(DIGIT_FONT[digit]):
+            for col, bit in enumerate(bits):
+                if bit == '1':
+                    fillRect(fb, left + i * glyphWidth + col * cellSize,
+                             top + row * cellSize, cellSize, cellSize, color)
+
+# ============================================================================
+# SCENE
+# ============================================================================
+def renderFrame(app, fb, drawUI=False):
+    """Render the current game state; returns the frame in the buffer's mode.
+
+    The returned array is a view of (or derived from) the framebuffer and is
+    overwritten by the next call; copy it to keep it.
+    """
+    fb['pixels'][:] = COLOR_INDEX['sky']
+
+    for lane in sorted(app.lanes, key=lambda l: l['y']):
+        renderLane(app, fb, lane)
+
+    renderCoins(app, fb)
+    renderPlayer(app, fb)
+
+    if drawUI:
+        renderUI(app, fb)
+
+    if fb['mode'] == 'rgb':
+        return PALETTE_RGB[fb['pixels']]
+    if fb['mode'] == 'gray':
+        return PALETTE_GRAY[fb['pixels']]
+    return fb['pixels']
+
+def renderLane(app, fb, lane):
+    """Render a lane background and its obstacles."""
+    y = lane['y']
+
+    if lane['type'] == GRASS:
+        isAlt = int(y / LANE_HEIGHT) % 2 == 0
+        fillBand(fb, y, LANE_HEIGHT, 'grass' if isAlt else 'grassAlt')
+        fillBand(fb, y + LANE_HEIGHT - 4, 4, 'grassDark')
+
+    elif lane['type'] == ROAD:
+        fillBand(fb, y, LANE_HEIGHT, 'road')
+        fillBand(fb, y + LANE_HEIGHT - 5, 5, 'roadDark')
+        fillBand(fb, y + LANE_HEIGHT // 2 - 2, 4, 'roadLine', fb['roadDashCols'])
+
+    elif lane['type'] == WATER:
+        fillBand(fb, y, LANE_HEIGHT, 'water')
+        fillBand(fb, y + LANE_HEIGHT - 5, 5, 'waterDark')
+
+    elif lane['type'] == RAIL:
+        fillBand(fb, y, LANE_HEIGHT, 'rail')
+        fillBand(fb, y + LANE_HEIGHT - 5, 5, 'railDark')
+        fillBand(fb, y + 10, LANE_HEIGHT - 22, 'railTie', fb['railTieCols'])
+        fillBand(fb, y + 14, 6, 'silver')
+        fillBand(fb, y + LANE_HEIGHT - 22, 6, 'silver')
+
+        if lane['trainWarning']:
+            flashOn = (lane['trainWarningTimer'] // 4) % 2 == 0
+            light = 'trainWarning' if flashOn else 'darkRed'
+            fillRect(fb, 15, y + 5, 8, LANE_HEIGHT - 10, 'dimGray')
+            fillOval(fb, 19, y + 12, 20, 20, light)
+            fillRect(fb, CANVAS_WIDTH - 23, y + 5, 8, LANE_HEIGHT - 10, 'dimGray')
+            fillOval(fb, CANVAS_WIDTH - 19, y + 12, 20, 20, light)
+
+    for obs in lane['obstacles']:
+        renderObstacle(fb, obs, y)
+
+def renderObstacle(fb, obs, laneY):
+    """Render an obstacle with the same footprint as drawObstacle25D."""
+    x = obs['x']
+    w = obs['width']
+    h = obs['height']
+    baseY = laneY + (LANE_HEIGHT - h) // 2
+    left = x - w // 2
+
+    # Skip anything entirely off the sides (trains wait far off-screen)
+    if left > CANVAS_WIDTH or left + w < 0:
+        return
+
+    if obs['type'] == 'car':
+        depth = 18
+        cabinW = w * 0.5
+        cabinH = h * 0.6
+        fillRect(fb, left + 3, baseY + h - depth, w - 6, depth, obs['color'] + 'Dark')
+        fillRect(fb, left, baseY - depth, w, h, obs['color'])
+        fillRect(fb, x - cabinW // 2, baseY - depth - 12, cabinW, cabinH, obs['color'])
+        fillRect(fb, x - (cabinW - 10) // 2, baseY - depth - 7, cabinW - 10, cabinH - 10, 'window')
+        fillOval(fb, x - w // 3, baseY + h - 5, 20, 14, 'wheel')
+        fillOval(fb, x + w // 3, baseY + h - 5, 20, 14, 'wheel')
+
+    elif obs['type'] == 'log':
+        fillRect(fb, left, baseY, w, h - 5, 'log')
+        fillRect(fb, left, baseY + h - 10, w, 8, 'logDark')
+        fillOval(fb, x, baseY + 5, w - 4, 14, 'logLight')
+
+    elif obs['type'] == 'train':
+        depth = 25
+        fillRect(fb, left, baseY + h - depth, w, depth, 'trainDark')
+        fillRect(fb, left, baseY - depth, w, h, 'train')
+        fillRect(fb, left - 5, baseY - depth - 10, 60, h + 10, 'loco')
+        fillRect(fb, left - 5, baseY + h - depth - 10, 60, depth + 10, 'locoDark')
+
+    elif obs['type'] == 'tree':
+        fillRect(fb, x - 7, baseY + h - 25, 14, 25, 'trunk')
+        fillOval(fb, x, baseY + 17, 40, 30, 'tree')
+        fillOval(fb, x, baseY + 3, 34, 26, 'treeDark')
+        fillOval(fb, x, baseY - 9, 24, 20, 'tree')
+
+def renderCoins(app, fb):
+    """Render uncollected coins with the same bobbing as drawCoins."""
+    for coin in app.coins:
+        if coin['collected']:
+            continue
+        y = coin['y'] + math.sin(app.coinPhase + coin['x'] * 0.05) * 4
+        fillOval(fb, coin['x'], y + 3, 24, 22, 'coinEdge')
+        fillOval(fb, coin['x'], y, 24, 22, 'coin')
+
+def renderPlayer(app, fb):
+    """Render the chicken as body, head, comb and beak."""
+    x = app.playerX
+    y = app.playerY - app.hopHeight
+    facing = app.playerFacing
+
+    fillOval(fb, x, y - 2, 28, 22, 'player')
+    fillOval(fb, x + facing * 8, y + 2, 12, 16, 'playerDark')
+    fillOval(fb, x + facing * 5, y - 18, 18, 18, 'player')
+    fillOval(fb, x + facing * 3, y - 30, 7, 10, 'red')
+    fillRect(fb, x + facing * 16 - (10 if facing < 0 else 0), y - 16, 10, 6, 'beak')
+
+def renderUI(app, fb):
+    """Render the score, high score and coin boxes, plus the game over box."""
+    scoreX = CANVAS_WIDTH // 2
+    fillRect(fb, scoreX - 45, 8, 90, 44, 'hudBox')
+    fillRect(fb, scoreX - 45, 8, 90, 8, 'restartGreen')
+    fillNumber(fb, app.score, scoreX, 34, 4, 'hudText')
+
+    highX = CANVAS_WIDTH - 50
+    fillRect(fb, highX - 40, 8, 80, 38, 'hudBox')
+    fillRect(fb, highX - 40, 8, 80, 6, 'trainWarning')
+    fillNumber(fb, app.highScore, highX, 29, 3, 'hudGold')
+
+    coinX = 50
+    fillRect(fb, coinX - 40, 8, 80, 38, 'hudBox')
+    fillRect(fb, coinX - 40, 8, 80, 6, 'coin')
+    fillOval(fb, coinX - 22, 27, 18, 16, 'coin')
+    fillNumber(fb, app.coinCount, coinX + 12, 28, 3, 'hudGold')
+
+    if app.gameState == 'gameOver':
+        boxX = (CANVAS_WIDTH - 280) // 2
+        boxY = (CANVAS_HEIGHT - 230) // 2
+        fillRect(fb, boxX, boxY, 280, 230, 'hudBox')
+        fillRect(fb, boxX, boxY, 280, 50, 'gameOverRed')
+        fillNumber(fb, app.score, CANVAS_WIDTH // 2, boxY + 95, 6, 'hudText')
+        fillRect(fb, boxX + 40, boxY + 180, 200, 35, 'restartGreen')
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+def benchmark(width=84, height=126, mode='gray', frames=2000):
+    """Render frames of a scripted game and print frames per second."""
+    import random
+    import time
+
+    from main import createHeadlessApp, onStep, onKeyPress
+
+    app = createHeadlessApp(seed=0)
+    fb = newFramebuffer(width, height, mode)
+    keys = ['up', 'up', 'left', 'right']
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        if frame % 8 == 0:
+            onKeyPress(app, random.choice(keys))
+        onStep(app)
+        if app.gameState == 'gameOver':
+            onKeyPress(app, 'space')
+        renderFrame(app, fb, drawUI=True)
+    elapsed = time.perf_counter() - start
+    print(f'{frames} frames at {width}x{height} {mode}: {frames / elapsed:.0f} fps '
+          f'(including simulation)')
+
+if __name__ == '__main__':
+    benchmark()
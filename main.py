@@ -1,12 +1,29 @@
-from cmu_graphics import *
+import time
+STARTUP_BEGIN = time.perf_counter()
+
 import random
 import os
+import sys
+import types
+import json
+import struct
+import glob
+import heapq
+import bisect
+import math
+from collections import deque
 
 # ============================================================================
 # CONSTANTS
 # ============================================================================
-CANVAS_WIDTH = 400
-CANVAS_HEIGHT = 600
+DEFAULT_CANVAS_WIDTH = 400
+DEFAULT_CANVAS_HEIGHT = 600
+CANVAS_WIDTH = DEFAULT_CANVAS_WIDTH  # Visible world size in logical pixels (see setViewport)
+CANVAS_HEIGHT = DEFAULT_CANVAS_HEIGHT
+DRAW_SCALE = 1  # Screen pixels per logical pixel
+MIN_VIEWPORT_SIZE = 100  # Smallest visible world width/height (room for a coin and a hop)
+CULL_MARGIN = 40  # Drawing reaches this far outside an obstacle's lane and width
+                  # (trains reach 33px above their lane top, train fronts 25px past their width)
 LANE_HEIGHT = 50
 PLAYER_SIZE = 40
 GRID_SIZE = 50  # Player moves in grid increments
@@ -14,74 +31,357 @@ GRID_SIZE = 50  # Player moves in grid increments
 # 2.5D Isometric settings
 ISO_HEIGHT = 20  # Height of objects for 3D effect
 
+# Level of detail (lowered when frames miss their time budget)
+LOD_FLAT = 0        # Flat rectangles only
+LOD_SIMPLE = 1      # Bodies only: no shadows, highlights, wheels or windows
+LOD_NO_SHADOWS = 2  # Full shapes without shadows and highlights
+LOD_FULL = 3        # Everything
+LOD_HISTORY = 30  # Frames averaged by the detail governor
+LOD_DOWNGRADE_RATIO = 1.15  # Average frame time (x budget) that lowers detail
+LOD_UPGRADE_RATIO = 1.05  # Average frame time (x budget) that counts as headroom
+LOD_UPGRADE_HOLD = 90  # Frames of headroom needed before raising detail
+LOD_MAX_UPGRADE_HOLD = 30 * 30  # Cap for the hold after failed upgrades
+LOD_STALL_TIME = 1.0  # Longer gaps are window drags/suspends, not render cost
+
+# Game events (see subscribe); handlers get (app, value) with the value below
+EVENT_STEP = 0  # None; every step, before the game updates
+EVENT_HOP = 1  # None; a hop has landed
+EVENT_ROW_PASSED = 2  # y of the row reached; a new furthest row
+EVENT_NEW_BEST = 3  # score; the high score went up
+EVENT_COIN = 4  # coin dict; a coin was collected
+EVENT_DEATH = 5  # one of DEATH_CAUSES
+EVENT_TRAIN_WARNING = 6  # rail lane; a train is on its way
+EVENT_LANE_SPAWNED = 7  # lane dict; a lane was generated
+EVENT_NAMES = ('step', 'hop', 'rowPassed', 'newBest', 'coin', 'death', 'trainWarning',
+               'laneSpawned')
+
+# Metrics (kept on the app by the game loop, exported by metrics.py)
+COUNT_FRAMES = 0  # Simulated frames
+COUNT_COLLISION_CHECKS = 1  # Obstacles tested against the player
+COUNT_GAMES = 2  # Finished games
+COUNT_DEATHS = 3  # First of the per-cause death counters
+DEATH_CAUSES = ('water', 'car', 'train', 'drift')
+COUNTER_COUNT = COUNT_DEATHS + len(DEATH_CAUSES)
+FRAME_TIME_BUCKETS = (0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25, 1.0)  # Seconds
+SESSION_BUCKETS = (5, 10, 30, 60, 120, 300, 600, 1800)  # Seconds
+SCORE_BUCKETS = (0, 5, 10, 25, 50, 100, 250, 500)
+
+# Drawing API, imported from cmu_graphics by loadGraphics() (importing it is slow,
+# and the simulation does not need it). runApp expects 'app' in our globals too.
+GRAPHICS_NAMES = ('app', 'runApp', 'rgb', 'drawRect', 'drawOval', 'drawCircle',
+                  'drawLabel', 'drawImage', 'drawPolygon', 'drawLine')
+
 # Sprite paths
 ASSETS_PATH = 'assets'
 CHICKEN_SPRITE_PATH = os.path.join(ASSETS_PATH, 'chicken_sprite.png')
 COIN_SPRITE_PATH = os.path.join(ASSETS_PATH, 'coin_sprite.png')
 TROPHY_SPRITE_PATH = os.path.join(ASSETS_PATH, 'trophy_sprite.png')
 
+# Ghost runs (recorded position tracks replayed on the same seeded world)
+GHOSTS_PATH = 'ghosts'
+DEFAULT_GHOST_SEED = 15113
+MAX_GHOSTS = 50  # Most recent runs raced against (older tracks are deleted)
+GHOST_OPACITY = 35
+GHOST_MAGIC = b'CRG2'
+GHOST_HEADER = struct.Struct('<4sqIii')  # magic, seed (64-bit), frames, start x, start worldY
+GHOST_DELTA = struct.Struct('<bb')  # Per-frame (dx, dy) in pixels
+GHOST_ESCAPE = -128  # dx value marking an absolute '<ii' position instead
+GHOST_POSITION = struct.Struct('<ii')
+
 # Lane types
 GRASS = 'grass'
 ROAD = 'road'
 WATER = 'water'
 RAIL = 'rail'
 
-# Colors with RGB for 2.5D shading
-COLORS = {
-    'grass': rgb(86, 176, 76),
-    'grassAlt': rgb(100, 190, 90),
-    'grassDark': rgb(70, 150, 60),
-    'road': rgb(80, 80, 85),
-    'roadDark': rgb(60, 60, 65),
-    'roadLine': rgb(255, 255, 255),
-    'water': rgb(70, 180, 220),
-    'waterDark': rgb(50, 140, 180),
-    'waterHighlight': rgb(150, 220, 255),
-    'rail': rgb(120, 100, 80),
-    'railDark': rgb(90, 70, 50),
-    'railTie': rgb(160, 130, 100),
-    'player': rgb(255, 220, 100),
-    'playerDark': rgb(220, 180, 60),
-    'car1': rgb(220, 60, 60),
-    'car1Dark': rgb(180, 40, 40),
-    'car2': rgb(70, 130, 220),
-    'car2Dark': rgb(50, 100, 180),
-    'car3': rgb(180, 80, 200),
-    'car3Dark': rgb(140, 50, 160),
-    'truck': rgb(240, 180, 50),
-    'truckDark': rgb(200, 140, 30),
-    'log': rgb(160, 110, 70),
-    'logDark': rgb(120, 80, 50),
-    'logLight': rgb(190, 140, 100),
-    'train': rgb(100, 100, 110),
-    'trainDark': rgb(70, 70, 80),
-    'trainWarning': rgb(255, 230, 50),
-    'shadow': rgb(0, 0, 0),
-    'tree': rgb(50, 130, 50),
-    'treeDark': rgb(30, 100, 30),
-    'trunk': rgb(140, 100, 60),
-    'trunkDark': rgb(100, 70, 40),
+# World generation (see generateLane)
+START_ROWS = 2  # Safe grass rows the player starts on
+BASE_SPEED = 2
+LANE_WEIGHTS = ((GRASS, 25), (ROAD, 45), (WATER, 20), (RAIL, 10))
+ROW_HASH_MASK = (1 << 64) - 1
+SALT_LANE_TYPE = 1  # Separate hash streams per kind of draw
+SALT_LANE = 2
+SALT_CORRIDOR = 3
+SALT_COIN = 4
+SALT_LANE_REPEAT = 5
+LANE_TYPE_WINDOW = 16  # Rows below a row replayed to find its neighbours' final types
+
+# Trains
+TRAIN_CHANCE = 0.005  # Chance per idle frame that a train is on its way
+TRAIN_WARNING_FRAMES = 60  # 2 seconds of flashing lights before it arrives
+
+# Long runs move the world origin back to the player every so often
+REBASE_FRAMES = 30 * 60 * 10  # 10 minutes of play
+
+# Headless bot (attract mode, soak tests)
+BOT_HOP_FRAMES = 7  # A hop covers GRID_SIZE at 8px per frame
+BOT_LOOKAHEAD = 3  # Frames a spot has to stay safe after landing
+BOT_MARGIN = 6  # Extra clearance (px) around cars and log ends
+BOT_MOVES = (
+    ('up', 0, -GRID_SIZE),
+    ('left', -GRID_SIZE, 0),
+    ('right', GRID_SIZE, 0),
+    (None, 0, 0),
+    ('down', 0, GRID_SIZE),
+)
+
+# Small integer codes for binary formats (snapshots, network)
+LANE_TYPES = (GRASS, ROAD, WATER, RAIL)
+OBSTACLE_TYPES = ('car', 'log', 'train', 'tree')
+OBSTACLE_COLORS = ('car1', 'car2', 'car3', 'truck', 'log', 'train', 'tree')
+GAME_STATES = ('playing', 'gameOver')
+MOVE_KEYS = ('up', 'down', 'left', 'right')
+KEY_CODES = {key: i for i, keys in enumerate((('up', 'w', 'W'), ('down', 's', 'S'),
+                                               ('left', 'a', 'A'), ('right', 'd', 'D')))
+             for key in keys}
+
+# Input log of a game: (steps played, MOVE_KEYS index) per move key pressed
+INPUT_RECORD = struct.Struct('<IB')
+
+# Snapshots (binary save/restore of a whole game)
+SNAPSHOT_MAGIC = b'CRS1'
+SNAPSHOT_VERSION = 6
+SNAPSHOT_HEADER = struct.Struct('<4sHqBIIddddddBIdhhbdddddIIIdHHIBI')
+SNAPSHOT_NO_CAUSE = 255  # deathCause while the game is still on
+SNAPSHOT_RNG = struct.Struct('<625IBd')  # Mersenne Twister state, gauss_next
+SNAPSHOT_LANE = struct.Struct('<BIdbdBhBiiB')
+SNAPSHOT_OBSTACLE = struct.Struct('<BdHBB')
+SNAPSHOT_COIN = struct.Struct('<dddIB')
+
+# Colors with RGB for 2.5D shading (raw values are shared with offscreen renderers)
+PALETTE = {
+    'grass': (86, 176, 76),
+    'grassAlt': (100, 190, 90),
+    'grassDark': (70, 150, 60),
+    'road': (80, 80, 85),
+    'roadDark': (60, 60, 65),
+    'roadLine': (255, 255, 255),
+    'water': (70, 180, 220),
+    'waterDark': (50, 140, 180),
+    'waterHighlight': (150, 220, 255),
+    'rail': (120, 100, 80),
+    'railDark': (90, 70, 50),
+    'railTie': (160, 130, 100),
+    'player': (255, 220, 100),
+    'playerDark': (220, 180, 60),
+    'car1': (220, 60, 60),
+    'car1Dark': (180, 40, 40),
+    'car2': (70, 130, 220),
+    'car2Dark': (50, 100, 180),
+    'car3': (180, 80, 200),
+    'car3Dark': (140, 50, 160),
+    'truck': (240, 180, 50),
+    'truckDark': (200, 140, 30),
+    'log': (160, 110, 70),
+    'logDark': (120, 80, 50),
+    'logLight': (190, 140, 100),
+    'train': (100, 100, 110),
+    'trainDark': (70, 70, 80),
+    'trainWarning': (255, 230, 50),
+    'shadow': (0, 0, 0),
+    'tree': (50, 130, 50),
+    'treeDark': (30, 100, 30),
+    'trunk': (140, 100, 60),
+    'trunkDark': (100, 70, 40),
 }
 
+class LazyColors(dict):
+    """Builds the rgb() color for a PALETTE entry the first time it is used."""
+    def __missing__(self, name):
+        color = self[name] = rgb(*PALETTE[name])
+        return color
+
+COLORS = LazyColors()
+brokenSprites = set()  # Sprite paths that failed to load (use the fallback drawing)
+layerImages = {}  # (UI art, scale) -> painted layer (see getLayerImage)
+
+# Startup timings in seconds since this module started importing
+STARTUP_TIMES = {}
+
+def recordStartupTime(name):
+    """Record the first time a startup milestone is reached."""
+    if name not in STARTUP_TIMES:
+        STARTUP_TIMES[name] = time.perf_counter() - STARTUP_BEGIN
+
+def loadGraphics():
+    """Import the cmu_graphics drawing API into this module (once)."""
+    if 'runApp' in globals():
+        return
+    import cmu_graphics
+    globals().update({name: getattr(cmu_graphics, name) for name in GRAPHICS_NAMES})
+    if DRAW_SCALE != 1:
+        scaleDrawing(DRAW_SCALE)
+    recordStartupTime('graphics')
+
+def newHistogram(bounds):
+    """Histogram with a count per bucket (values <= bound) plus an overflow bucket."""
+    return {'bounds': bounds, 'counts': [0] * (len(bounds) + 1), 'sum': 0}
+
+def observe(histogram, value):
+    """Add a value to a histogram."""
+    histogram['counts'][bisect.bisect_left(histogram['bounds'], value)] += 1
+    histogram['sum'] += value
+
+# ============================================================================
+# EVENTS
+# ============================================================================
+def subscribe(app, event, handler, batched=False):
+    """Call handler(app, value) on every event of a type (one of the EVENT_ codes).
+    
+    Batched handlers are called once at the end of each frame with a list of
+    that frame's (event, value) pairs instead, and not at all in quiet frames."""
+    if batched:
+        pending = []
+        collect = lambda app, value: pending.append((event, value))
+        app.eventBatches.append((handler, pending, collect))
+        handler = collect
+    # Handlers are kept as a tuple per event, so publishing is a plain loop
+    app.eventHandlers[event] += (handler,)
+    return handler
+
+def unsubscribe(app, event, subscription):
+    """Remove a handler, given what subscribe returned for it."""
+    app.eventHandlers[event] = tuple(h for h in app.eventHandlers[event] if h is not subscription)
+    app.eventBatches = [batch for batch in app.eventBatches if batch[2] is not subscription]
+
+def publish(app, event, value=None):
+    """Call an event's handlers.
+    
+    Call sites check app.eventHandlers[event] first, so events nobody
+    subscribed to cost one list lookup."""
+    for handler in app.eventHandlers[event]:
+        handler(app, value)
+
+def flushEvents(app):
+    """Hand each batched handler the events it collected this frame."""
+    for handler, pending, _ in app.eventBatches:
+        if pending:
+            events = pending[:]
+            pending.clear()
+            handler(app, events)
+
+# ============================================================================
+# VIEWPORT
+# ============================================================================
+def setViewport(width, height, scale=1):
+    """Set the visible world size (logical pixels) and the screen pixels per
+    logical pixel. Call before loadGraphics() and creating apps."""
+    global CANVAS_WIDTH, CANVAS_HEIGHT, DRAW_SCALE
+    if width < MIN_VIEWPORT_SIZE or height < MIN_VIEWPORT_SIZE:
+        raise ValueError(f'viewport {width}x{height} is smaller than '
+                         f'{MIN_VIEWPORT_SIZE}x{MIN_VIEWPORT_SIZE}')
+    CANVAS_WIDTH = width
+    CANVAS_HEIGHT = height
+    DRAW_SCALE = scale
+
+def scaledCount(count):
+    """Scale a per-lane object count with the viewport width (same density)."""
+    return round(count * CANVAS_WIDTH / DEFAULT_CANVAS_WIDTH)
+
+def isLaneVisible(lane):
+    """Whether a lane or anything standing on it can be on screen."""
+    # Obstacles are drawn above their lane top and shadows below its bottom
+    return -LANE_HEIGHT - CULL_MARGIN < lane['y'] < CANVAS_HEIGHT + CULL_MARGIN
+
+def isObstacleVisible(obs):
+    """Whether any part of an obstacle is within the viewport (plus CULL_MARGIN)."""
+    reach = obs['width'] / 2 + CULL_MARGIN
+    return -reach < obs['x'] < CANVAS_WIDTH + reach
+
+def scaleDrawing(scale):
+    """Wrap the drawing API so logical coordinates and sizes are scaled."""
+    # Leading arguments that aren't coordinates (label text, image path)
+    skipped = {'drawLabel': 1, 'drawImage': 1}
+    for name in ('drawRect', 'drawOval', 'drawCircle', 'drawLabel', 'drawImage',
+                 'drawPolygon', 'drawLine'):
+        globals()[name] = scaledDrawFunction(globals()[name], scale, skipped.get(name, 0))
+
+def scaledDrawFunction(draw, scale, skip):
+    def drawScaled(*args, **kwargs):
+        args = args[:skip] + tuple(value * scale for value in args[skip:])
+        for key in ('width', 'height', 'borderWidth', 'lineWidth'):
+            if key in kwargs:
+                kwargs[key] *= scale
+        if draw.__name__ == 'drawLabel':
+            kwargs['size'] = kwargs.get('size', 12) * scale
+        return draw(*args, **kwargs)
+    return drawScaled
+
 # ============================================================================
 # GAME INITIALIZATION
 # ============================================================================
-def onAppStart(app):
-    app.width = CANVAS_WIDTH
-    app.height = CANVAS_HEIGHT
+def onAppStart(app, seed=None, startupBenchmark=False, ghostSeed=None, metricsTarget=None,
+               analyticsPath=None, captureTarget=None, captureEvery=1):
+    app.width = round(CANVAS_WIDTH * DRAW_SCALE)
+    app.height = round(CANVAS_HEIGHT * DRAW_SCALE)
     app.stepsPerSecond = 30
     
-    resetGame(app)
+    # Detail governor (kept across games)
+    app.detailLevel = LOD_FULL
+    app.frameTimes = deque(maxlen=LOD_HISTORY)
+    app.lastStepTime = None
+    app.framesWithHeadroom = 0
+    app.lodUpgradeHold = LOD_UPGRADE_HOLD
+    app.lastLodChange = 0  # +1 after an upgrade, -1 after a downgrade
+    
+    # Frames between coordinate rebases (see rebaseCoordinates)
+    app.rebaseInterval = REBASE_FRAMES
+    
+    # Metrics (kept across games)
+    app.counters = [0] * COUNTER_COUNT
+    app.frameTimeHistogram = newHistogram(FRAME_TIME_BUCKETS)
+    app.sessionHistogram = newHistogram(SESSION_BUCKETS)
+    app.scoreHistogram = newHistogram(SCORE_BUCKETS)
+    if metricsTarget is not None:
+        import metrics
+        metrics.startExporter(app, metricsTarget)
+    
+    # Event handlers by EVENT_ code, plus batched ones (see subscribe)
+    app.eventHandlers = [()] * len(EVENT_NAMES)
+    app.eventBatches = []
+    if analyticsPath is not None:
+        import analytics
+        analytics.attachToFile(app, analyticsPath)
+    
+    # Optional video recording (see capture.py)
+    if captureTarget is not None:
+        import capture
+        capture.startRecorder(app, captureTarget, captureEvery)
+    
+    # Cached HUD and game over layers, and draw calls this frame (see drawUILayer)
+    app.uiLayers = {}
+    app.uiDrawCalls = 0
+    app.uiDrawCallsSaved = 0
+    
+    # Startup instrumentation (see finishStartup)
+    app.awaitingFirstStep = True
+    app.startupBenchmark = startupBenchmark
+    
+    # Ghost race mode: every game uses ghostSeed and races earlier runs on it
+    app.ghostSeed = ghostSeed
+    if ghostSeed is not None:
+        seed = ghostSeed
+    
+    resetGame(app, seed)
+    recordStartupTime('world')
 
-def resetGame(app):
-    """Reset all game state for a new game."""
+def resetGame(app, seed=None):
+    """Reset all game state for a new game (random world unless seed is given)."""
+    # The world is a function of the seed (see generateLane), so runs can be replayed
+    if seed is None:
+        seed = random.randrange(2**32)
+    app.seed = seed
+    # Trains draw from their own stream
+    app.eventRng = random.Random(f'events-{seed}')
+    
     # Game state
     app.gameState = 'playing'  # 'playing', 'gameOver'
+    app.gameStartTime = time.perf_counter()
     app.score = 0
     app.highScore = getattr(app, 'highScore', 0)  # Preserve high score across resets
     
     # Difficulty scaling (must be set before generating lanes)
-    app.baseSpeed = 2
+    app.baseSpeed = BASE_SPEED
     app.difficultyMultiplier = 1.0
     
     # Player state
@@ -97,6 +397,7 @@ def resetGame(app):
     
     # World scrolling
     app.scrollOffset = 0
+    app.scrollRebased = 0  # Scrolling removed from scrollOffset by rebasing
     app.furthestProgress = app.playerY  # Track furthest forward progress (lower Y = further)
     
     # Animation timers
@@ -107,202 +408,308 @@ def resetGame(app):
     app.coins = []  # List of coin positions {x, y, collected}
     app.coinCount = 0  # Total coins collected this game
     
+    # Replay record (see verify.py)
+    app.runFrames = 0  # Steps played this game
+    app.inputLog = bytearray()  # INPUT_RECORDs
+    app.deathCause = None
+    
     # Lane management
     app.lanes = []
+    app.nextRow = 0  # World row index of the next lane (0 = starting row)
     app.nextLaneY = CANVAS_HEIGHT - LANE_HEIGHT  # Y position for next lane to generate
     
+    # Trains run on a schedule: a heap of (frame, row, event) plus the rail
+    # lanes with a warning or train (idle rail lanes cost nothing per frame)
+    app.frame = 0
+    app.trainEvents = []
+    app.activeTrains = {}  # row -> lane
+    
     # Generate initial lanes
     generateInitialLanes(app)
+    
+    # Ghost recording and playback
+    startGhostRun(app)
 
 # ============================================================================
 # LANE GENERATION
 # ============================================================================
+# A world row is a pure function of (seed, row): its random numbers come from
+# hashing the two, and the rules that look at neighbouring rows only look a
+# fixed number of rows down. Any row can be built (and rebuilt) on its own.
+
 def generateInitialLanes(app):
     """Generate the initial set of lanes to fill the screen."""
-    # First two lanes are always safe grass
-    for i in range(2):
-        y = CANVAS_HEIGHT - LANE_HEIGHT * (i + 1)
-        createLane(app, y, GRASS, isInitial=True)
-    
-    # Fill rest of screen with random lanes
-    app.nextLaneY = CANVAS_HEIGHT - LANE_HEIGHT * 3
     while app.nextLaneY > -LANE_HEIGHT:
         createLane(app, app.nextLaneY)
         app.nextLaneY -= LANE_HEIGHT
 
-def createLane(app, y, forceType=None, isInitial=False):
-    """Create a new lane at the specified y position."""
-    # Determine lane type
-    if forceType:
-        laneType = forceType
-    else:
-        laneType = getRandomLaneType(app)
+def createLane(app, y):
+    """Add the lane for the next world row at the specified y position."""
+    lane = generateLane(app.seed, app.nextRow)
+    lane['y'] = y
+    if lane['type'] == RAIL:
+        # Trains spawn on a schedule, just plan the first one
+        scheduleTrain(app, lane, app.frame)
+    
+    coinX = generateCoinX(app.seed, lane)
+    if coinX is not None:
+        app.coins.append({
+            'x': coinX,
+            'y': y + LANE_HEIGHT // 2,
+            'laneY': y,  # Track lane for scrolling
+            'row': lane['row'],  # At most one coin per lane
+            'collected': False
+        })
     
-    # Create lane data structure
+    app.lanes.append(lane)
+    app.nextRow += 1
+    if app.eventHandlers[EVENT_LANE_SPAWNED]:
+        publish(app, EVENT_LANE_SPAWNED, lane)
+    return lane
+
+def generateLane(seed, row):
+    """Build world row `row` of a seed's world (y is left for the caller)."""
+    laneType = getLaneType(seed, row)
+    rng = getRowRandom(seed, row, SALT_LANE)
     lane = {
         'type': laneType,
-        'y': y,
-        'direction': random.choice([-1, 1]),
-        'speed': getSpeedForLane(app, laneType),
+        'row': row,
+        'y': 0,
+        'direction': rng.choice([-1, 1]),
+        'speed': getSpeedForLane(rng, laneType, row),
         'obstacles': [],
         'trainWarning': False,
         'trainWarningTimer': 0,
         'trainComing': False,
+        'trainArrival': 0,  # Frame the next (or current) train arrives (rail only)
+        'trainExit': 0,  # Frame the current train leaves (rail only)
     }
-    
-    # Generate obstacles for the lane
-    if not isInitial or laneType == GRASS:
-        generateObstaclesForLane(app, lane, isInitial)
-    
-    # Maybe spawn a coin on this lane (not on initial safe lanes)
-    if not isInitial and random.random() < 0.15:  # 15% chance per lane
-        spawnCoinOnLane(app, lane)
-    
-    app.lanes.append(lane)
+    generateObstaclesForLane(seed, rng, lane)
     return lane
 
-def getRandomLaneType(app):
+def getRowHash(seed, row, salt):
+    """64-bit hash of (seed, row, salt), mixed with the splitmix64 finalizer."""
+    x = (seed * 0x9E3779B97F4A7C15 + row * 0xBF58476D1CE4E5B9 + salt) & ROW_HASH_MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & ROW_HASH_MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & ROW_HASH_MASK
+    return x ^ (x >> 31)
+
+def getRowRandom(seed, row, salt):
+    """Random generator for one row's draws of one kind."""
+    return random.Random(getRowHash(seed, row, salt))
+
+def getDrawnLaneType(seed, row):
+    """Lane type a row draws before the anti-repeat rule."""
+    if row < START_ROWS:
+        return GRASS
+    return pickWeighted(LANE_WEIGHTS, getRowHash(seed, row, SALT_LANE_TYPE))
+
+def getLaneType(seed, row):
     """Get a random lane type with weighted probabilities."""
-    weights = [
-        (GRASS, 25),
-        (ROAD, 45),
-        (WATER, 20),
-        (RAIL, 10),
-    ]
-    
-    # Avoid too many consecutive lanes of same type
-    if len(app.lanes) >= 2:
-        lastTypes = [app.lanes[-1]['type'], app.lanes[-2]['type']]
-        if lastTypes[0] == lastTypes[1]:
-            # Reduce weight of repeated type
-            weights = [(t, w // 2 if t == lastTypes[0] else w) for t, w in weights]
-    
-    # Weighted random selection
+    if row < START_ROWS:
+        return GRASS  # The player starts on safe grass
+    
+    # The anti-repeat rule looks at the final types of the two rows below,
+    # which depend on the rows below them. Work them out from LANE_TYPE_WINDOW
+    # rows down, starting from their drawn types: the final types only differ
+    # from the drawn ones after a rejected repeat, so by then they have
+    # (almost surely) caught up with the true ones, and the row stays a pure
+    # function of (seed, row).
+    first = max(START_ROWS, row - LANE_TYPE_WINDOW)
+    secondLast = getDrawnLaneType(seed, first - 2)
+    last = getDrawnLaneType(seed, first - 1)
+    for r in range(first, row + 1):
+        secondLast, last = last, applyRepeatRule(seed, r, last, secondLast)
+    return last
+
+def applyRepeatRule(seed, row, lastType, secondLastType):
+    """A row's type given the final types of the two rows below it.
+    
+    Avoid too many consecutive lanes of same type: after two of a kind, that
+    type's weight is halved. The drawn type is kept unless it is the repeated
+    type and loses a second draw, in which case one of the other types is
+    drawn in proportion to their weights. That gives exactly the halved
+    weights while changing as few rows as possible."""
+    drawn = getDrawnLaneType(seed, row)
+    if drawn != lastType or lastType != secondLastType:
+        return drawn
+    
+    # Keep it with probability P(halved weights) / P(full weights)
+    weights = dict(LANE_WEIGHTS)
+    total = sum(weights.values())
+    weight = weights[drawn]
+    halved = weight // 2
+    keepOdds = weight * (total - weight + halved)
+    hashValue = getRowHash(seed, row, SALT_LANE_REPEAT)
+    if hashValue % keepOdds < halved * total:
+        return drawn
+    others = [(t, w) for t, w in LANE_WEIGHTS if t != drawn]
+    return pickWeighted(others, hashValue // keepOdds)
+
+def pickWeighted(weights, hashValue):
+    """Weighted selection of a lane type by a 64-bit hash."""
     total = sum(w for _, w in weights)
-    r = random.randint(1, total)
-    cumulative = 0
+    r = hashValue % total
     for laneType, weight in weights:
-        cumulative += weight
-        if r <= cumulative:
+        if r < weight:
             return laneType
+        r -= weight
     return GRASS
 
-def getSpeedForLane(app, laneType):
+def getDifficulty(progress):
+    """Speed multiplier after `progress` rows (score or world row)."""
+    return min(1.0 + (progress / 100) * 0.5, 3.0)  # Cap at 3x
+
+def getSpeedForLane(rng, laneType, row):
     """Get movement speed for a lane based on type and difficulty."""
-    baseSpeed = app.baseSpeed * app.difficultyMultiplier
+    baseSpeed = BASE_SPEED * getDifficulty(row)
     
     if laneType == ROAD:
-        return baseSpeed * random.uniform(1.0, 2.5)
+        return baseSpeed * rng.uniform(1.0, 2.5)
     elif laneType == WATER:
-        return baseSpeed * random.uniform(0.8, 1.5)
+        return baseSpeed * rng.uniform(0.8, 1.5)
     elif laneType == RAIL:
         return baseSpeed * 8  # Trains are fast!
     return 0
 
-def generateObstaclesForLane(app, lane, isInitialLane=False):
-    """Generate obstacles for a lane based on its type."""
+def generateObstaclesForLane(seed, rng, lane):
+    """Generate obstacles for a lane based on its type (trains are scheduled)."""
     if lane['type'] == ROAD:
-        generateCars(app, lane)
+        generateCars(rng, lane)
     elif lane['type'] == WATER:
-        generateLogs(app, lane)
-    elif lane['type'] == RAIL:
-        # Trains spawn dynamically, just set up the lane
-        pass
+        generateLogs(rng, lane)
     elif lane['type'] == GRASS:
-        generateTrees(app, lane, isInitialLane)
+        generateTrees(rng, lane, getCorridorColumns(seed, lane['row']))
 
-def generateCars(app, lane):
+def generateCars(rng, lane):
     """Generate cars for a road lane."""
-    numCars = random.randint(2, 4)
-    carWidth = random.choice([60, 80, 100])  # Mix of car sizes
+    numCars = max(1, scaledCount(rng.randint(2, 4)))  # Narrow views still get a car
+    carWidth = rng.choice([60, 80, 100])  # Mix of car sizes
     spacing = CANVAS_WIDTH // numCars
     
     for i in range(numCars):
-        x = i * spacing + random.randint(-20, 20)
+        x = i * spacing + rng.randint(-20, 20)
         car = {
             'type': 'car',
             'x': x,
             'width': carWidth,
             'height': 35,
-            'color': random.choice([COLORS['car1'], COLORS['car2'], COLORS['car3'], COLORS['truck']]),
+            'color': rng.choice(['car1', 'car2', 'car3', 'truck']),
         }
         lane['obstacles'].append(car)
 
-def generateLogs(app, lane):
+def generateLogs(rng, lane):
     """Generate logs for a water lane."""
-    numLogs = random.randint(2, 3)
-    logWidth = random.choice([80, 100, 120])
+    numLogs = max(1, scaledCount(rng.randint(2, 3)))  # A water lane needs a log
+    logWidth = rng.choice([80, 100, 120])
     spacing = CANVAS_WIDTH // numLogs + 50
     
     for i in range(numLogs):
-        x = i * spacing + random.randint(-30, 30)
+        x = i * spacing + rng.randint(-30, 30)
         log = {
             'type': 'log',
             'x': x,
             'width': logWidth,
             'height': 40,
-            'color': COLORS['log'],
+            'color': 'log',
         }
         lane['obstacles'].append(log)
 
-def generateTrees(app, lane, isInitialLane=False):
-    """Generate decorative trees for grass lanes."""
-    numTrees = random.randint(0, 3)
+def generateTrees(rng, lane, corridor):
+    """Generate trees for a grass lane, keeping the corridor columns clear."""
+    numTrees = scaledCount(rng.randint(0, 3))
     usedPositions = []
     
-    # Player starts at center (CANVAS_WIDTH // 2 = 200)
+    # Player starts at center
     playerStartX = CANVAS_WIDTH // 2
+    isInitialLane = lane['row'] < START_ROWS
     
     for _ in range(numTrees):
         attempts = 0
         while attempts < 10:
-            x = random.randint(20, CANVAS_WIDTH - 20)
+            x = rng.randint(20, CANVAS_WIDTH - 20)
             # Check not blocking center path too much
             tooCloseToOther = any(abs(x - pos) < 60 for pos in usedPositions)
             # On initial lanes, don't place trees where player spawns
             tooCloseToPlayer = isInitialLane and abs(x - playerStartX) < 50
+            # The corridor keeps every world passable
+            inCorridor = getColumnMask(x - 20, x + 20) & corridor
             
-            if not tooCloseToOther and not tooCloseToPlayer:
+            if not tooCloseToOther and not tooCloseToPlayer and not inCorridor:
                 tree = {
                     'type': 'tree',
                     'x': x,
                     'width': 40,
                     'height': 45,
-                    'color': 'darkGreen',
+                    'color': 'tree',
                 }
                 lane['obstacles'].append(tree)
                 usedPositions.append(x)
                 break
             attempts += 1
 
-def spawnCoinOnLane(app, lane):
-    """Spawn a coin at a random x position on the lane."""
-    # Avoid spawning on water lanes (too hard to get)
-    if lane['type'] == WATER:
-        return
+def getColumnMask(left, right):
+    """Bitmask of the GRID_SIZE-wide columns that [left, right] overlaps."""
+    first = max(0, int(left // GRID_SIZE))
+    last = min(CANVAS_WIDTH // GRID_SIZE - 1, int(right // GRID_SIZE))
+    return ((2 << (last - first)) - 1) << first if first <= last else 0
+
+def getCorridorColumn(seed, row):
+    """Column a grass row keeps clear (the player's column on the start rows)."""
+    if row < START_ROWS:
+        return CANVAS_WIDTH // 2 // GRID_SIZE
+    return getRowHash(seed, row, SALT_CORRIDOR) % (CANVAS_WIDTH // GRID_SIZE)
+
+def getCorridorColumns(seed, row):
+    """Bitmask of the columns a grass row keeps clear of trees.
+    
+    Roads, water and rails never block sideways moves, so the corridor
+    column of a grass row can be reached from anywhere on them. After
+    another grass row, the columns between both corridor columns are kept
+    clear too, so the player can step up from one and walk over to the other."""
+    column = getCorridorColumn(seed, row)
+    if getLaneType(seed, row - 1) != GRASS:
+        return 1 << column
+    below = getCorridorColumn(seed, row - 1)
+    return getColumnMask(min(column, below) * GRID_SIZE, max(column, below) * GRID_SIZE)
+
+def generateCoinX(seed, lane):
+    """x of a lane's coin, or None for the 85% of lanes without one."""
+    # No coins on the start rows, and none on water lanes (too hard to get)
+    if lane['row'] < START_ROWS or lane['type'] == WATER:
+        return None
+    rng = getRowRandom(seed, lane['row'], SALT_COIN)
+    if rng.random() >= 0.15:  # 15% chance per lane
+        return None
     
-    x = random.randint(50, CANVAS_WIDTH - 50)
+    x = rng.randint(50, CANVAS_WIDTH - 50)
     
     # Check we're not too close to a tree on grass lanes
     if lane['type'] == GRASS:
         for obs in lane['obstacles']:
             if obs['type'] == 'tree' and abs(obs['x'] - x) < 50:
-                return  # Skip spawning if too close to tree
-    
-    coin = {
-        'x': x,
-        'y': lane['y'] + LANE_HEIGHT // 2,
-        'laneY': lane['y'],  # Track lane for scrolling
-        'collected': False
-    }
-    app.coins.append(coin)
+                return None  # Skip spawning if too close to tree
+    return x
 
 # ============================================================================
 # GAME UPDATE LOGIC
 # ============================================================================
 def onStep(app):
+    if app.awaitingFirstStep:
+        finishStartup(app)
+    
+    # Adjust rendering detail to the measured frame rate
+    updateDetailGovernor(app)
+    
+    if app.eventHandlers[EVENT_STEP]:
+        publish(app, EVENT_STEP)
+    
     if app.gameState != 'playing':
+        if app.eventBatches:
+            flushEvents(app)
         return
+    app.counters[COUNT_FRAMES] += 1
+    app.runFrames += 1
     
     # Update animation timers
     app.waterPhase += 0.1
@@ -337,6 +744,74 @@ def onStep(app):
     
     # Update difficulty based on score
     updateDifficulty(app)
+    
+    # Record this frame (saving the run if it just ended) and advance the ghosts
+    updateGhosts(app)
+    
+    # Keep world coordinates and clocks small on long runs
+    if app.frame >= app.rebaseInterval:
+        rebaseCoordinates(app)
+    
+    if app.eventBatches:
+        flushEvents(app)
+
+def finishStartup(app):
+    """The first step means the game loop is running and taking input."""
+    app.awaitingFirstStep = False
+    recordStartupTime('firstInteractive')
+    if app.startupBenchmark:
+        print(json.dumps(STARTUP_TIMES))
+        app.quit()
+
+def updateDetailGovernor(app):
+    """Lower or raise the detail level based on recent frame times."""
+    now = time.perf_counter()
+    lastStepTime = app.lastStepTime
+    app.lastStepTime = now
+    if lastStepTime is None:
+        return
+    
+    frameTime = now - lastStepTime
+    observe(app.frameTimeHistogram, frameTime)
+    if frameTime > LOD_STALL_TIME:
+        app.frameTimes.clear()
+        return
+    app.frameTimes.append(frameTime)
+    if len(app.frameTimes) < LOD_HISTORY:
+        return
+    
+    budget = 1 / app.stepsPerSecond
+    average = sum(app.frameTimes) / len(app.frameTimes)
+    
+    if average > budget * LOD_DOWNGRADE_RATIO:
+        if app.detailLevel > LOD_FLAT:
+            # An upgrade that immediately misses makes the next one wait longer
+            if app.lastLodChange > 0:
+                app.lodUpgradeHold = min(app.lodUpgradeHold * 2, LOD_MAX_UPGRADE_HOLD)
+            setDetailLevel(app, app.detailLevel - 1)
+        return
+    
+    if average <= budget * LOD_UPGRADE_RATIO:
+        app.framesWithHeadroom += 1
+    else:
+        app.framesWithHeadroom = 0
+    
+    if app.framesWithHeadroom >= app.lodUpgradeHold:
+        if app.lastLodChange > 0:
+            # Last upgrade held up, so go back to the normal hold time
+            app.lodUpgradeHold = LOD_UPGRADE_HOLD
+            app.lastLodChange = 0
+        if app.detailLevel < LOD_FULL:
+            setDetailLevel(app, app.detailLevel + 1)
+        else:
+            app.framesWithHeadroom = 0
+
+def setDetailLevel(app, level):
+    """Switch detail level and start measuring it from scratch."""
+    app.lastLodChange = 1 if level > app.detailLevel else -1
+    app.detailLevel = level
+    app.frameTimes.clear()
+    app.framesWithHeadroom = 0
 
 def checkCoinCollection(app):
     """Check if player collects any coins."""
@@ -361,6 +836,8 @@ def checkCoinCollection(app):
             playerBottom > coinTop and playerTop < coinBottom):
             coin['collected'] = True
             app.coinCount += 1
+            if app.eventHandlers[EVENT_COIN]:
+                publish(app, EVENT_COIN, coin)
 
 def cleanupOldCoins(app):
     """Remove coins that have scrolled off screen."""
@@ -404,62 +881,110 @@ def updatePlayerHop(app):
         app.isHopping = False
         app.hopFrame = 0
         app.hopHeight = 0
+        if app.eventHandlers[EVENT_HOP]:
+            publish(app, EVENT_HOP)
 
 def updateLanes(app):
     """Update all lane obstacles."""
     for lane in app.lanes:
         # Move obstacles horizontally
-        if lane['type'] in [ROAD, WATER]:
-            for obs in lane['obstacles']:
-                obs['x'] += lane['speed'] * lane['direction']
-                
-                # Wrap around screen
-                if lane['direction'] > 0 and obs['x'] > CANVAS_WIDTH + obs['width']:
-                    obs['x'] = -obs['width']
-                elif lane['direction'] < 0 and obs['x'] < -obs['width']:
-                    obs['x'] = CANVAS_WIDTH + obs['width']
+        if lane['type'] in (ROAD, WATER):
+            moveLaneObstacles(lane)
+    
+    # Handle train lanes
+    updateTrains(app)
+
+def moveLaneObstacles(lane):
+    """Move a road or water lane's obstacles one frame, wrapping at the edges."""
+    step = lane['speed'] * lane['direction']
+    for obs in lane['obstacles']:
+        x = obs['x'] + step
         
-        # Handle train lanes
-        if lane['type'] == RAIL:
-            updateTrainLane(app, lane)
+        # Wrap around screen
+        if step > 0:
+            if x > CANVAS_WIDTH + obs['width']:
+                x = -obs['width']
+        elif x < -obs['width']:
+            x = CANVAS_WIDTH + obs['width']
+        obs['x'] = x
+
+def scheduleTrain(app, lane, afterFrame):
+    """Plan the next train on a rail lane after it is idle from afterFrame."""
+    # Same distribution as rolling TRAIN_CHANCE on every idle frame: the number
+    # of frames until the first success is geometric
+    idleFrames = 1 + int(math.log(1 - app.eventRng.random()) / math.log(1 - TRAIN_CHANCE))
+    warningFrame = afterFrame + idleFrames
+    lane['trainArrival'] = warningFrame + TRAIN_WARNING_FRAMES - 1
+    heapq.heappush(app.trainEvents, (warningFrame, lane['row'], 'warn'))
+
+def nextTrainFrame(app, lane):
+    """Frame the next train arrives on a lane (None if it isn't a rail lane).
+    
+    If a train is passing now, this is the frame it arrived."""
+    if lane['type'] != RAIL:
+        return None
+    return lane['trainArrival']
 
-def updateTrainLane(app, lane):
-    """Handle train spawning and warnings."""
-    # Random chance to trigger train warning
-    if not lane['trainWarning'] and not lane['trainComing']:
-        if random.random() < 0.005:  # Low chance per frame
+def getLaneByRow(app, row):
+    """Find a lane by its world row (lanes are stored in row order)."""
+    if app.lanes:
+        index = row - app.lanes[0]['row']
+        if 0 <= index < len(app.lanes):
+            return app.lanes[index]
+    return None
+
+def updateTrains(app):
+    """Run the train events due this frame and move the active trains."""
+    app.frame += 1
+    events = app.trainEvents
+    while events and events[0][0] <= app.frame:
+        frame, row, event = heapq.heappop(events)
+        lane = getLaneByRow(app, row)
+        if lane is None:
+            app.activeTrains.pop(row, None)  # Lane scrolled away
+            continue
+        
+        if event == 'warn':
             lane['trainWarning'] = True
-            lane['trainWarningTimer'] = 60  # 2 seconds at 30fps
-    
-    # Count down warning timer
-    if lane['trainWarning']:
-        lane['trainWarningTimer'] -= 1
-        if lane['trainWarningTimer'] <= 0:
-            lane['trainWarning'] = False
-            lane['trainComing'] = True
-            # Spawn the train
-            train = {
-                'type': 'train',
-                'x': -400 if lane['direction'] > 0 else CANVAS_WIDTH + 400,
-                'width': 350,
-                'height': 45,
-                'color': COLORS['train'],
-            }
-            lane['obstacles'].append(train)
-    
-    # Move train
-    if lane['trainComing']:
-        for obs in lane['obstacles']:
-            if obs['type'] == 'train':
-                obs['x'] += lane['speed'] * lane['direction']
-                
-                # Train passed, reset lane
-                if lane['direction'] > 0 and obs['x'] > CANVAS_WIDTH + 100:
-                    lane['obstacles'].remove(obs)
-                    lane['trainComing'] = False
-                elif lane['direction'] < 0 and obs['x'] < -500:
-                    lane['obstacles'].remove(obs)
-                    lane['trainComing'] = False
+            app.activeTrains[row] = lane
+            heapq.heappush(events, (lane['trainArrival'], row, 'arrive'))
+            if app.eventHandlers[EVENT_TRAIN_WARNING]:
+                publish(app, EVENT_TRAIN_WARNING, lane)
+        elif event == 'arrive':
+            dispatchTrain(app, lane)
+        else:
+            lane['trainComing'] = False
+            lane['obstacles'] = []
+            del app.activeTrains[row]
+            scheduleTrain(app, lane, frame)
+    
+    for lane in app.activeTrains.values():
+        if lane['trainWarning']:
+            lane['trainWarningTimer'] = lane['trainArrival'] - app.frame
+        else:
+            lane['obstacles'][0]['x'] += lane['speed'] * lane['direction']
+
+def dispatchTrain(app, lane):
+    """Spawn the train and schedule the frame it has passed the screen."""
+    lane['trainWarning'] = False
+    lane['trainWarningTimer'] = 0
+    lane['trainComing'] = True
+    if lane['direction'] > 0:
+        startX, distance = -400, CANVAS_WIDTH + 100 + 400
+    else:
+        startX, distance = CANVAS_WIDTH + 400, CANVAS_WIDTH + 400 + 500
+    train = {
+        'type': 'train',
+        'x': startX,
+        'width': 350,
+        'height': 45,
+        'color': 'train',
+    }
+    lane['obstacles'] = [train]
+    
+    # The train moves on its arrival frame and is gone once it's past the edge
+    lane['trainExit'] = app.frame + int(distance // lane['speed'])
+    heapq.heappush(app.trainEvents, (lane['trainExit'], lane['row'], 'exit'))
 
 def updatePlayerOnLog(app):
     """Check if player is on a log and drift with it."""
@@ -481,7 +1006,7 @@ def updatePlayerOnLog(app):
                         
                         # Check if drifted off screen
                         if app.playerX < 0 or app.playerX > CANVAS_WIDTH:
-                            gameOver(app)
+                            gameOver(app, 'drift')
                     break
 
 def getLaneAtY(app, y):
@@ -517,15 +1042,17 @@ def checkCollisions(app):
     
     # Check water death (not on log)
     if playerLane['type'] == WATER and app.playerOnLog is None:
-        gameOver(app)
+        gameOver(app, 'water')
         return
     
     # Check car/train collisions
     if playerLane['type'] in [ROAD, RAIL]:
         for obs in playerLane['obstacles']:
-            if obs['type'] in ['car', 'train']:
+            # Off-screen cars and trains can't reach the player this frame
+            if obs['type'] in ['car', 'train'] and isObstacleVisible(obs):
+                app.counters[COUNT_COLLISION_CHECKS] += 1
                 if isPlayerOnObstacle(app, obs, playerLane['y']):
-                    gameOver(app)
+                    gameOver(app, obs['type'])
                     return
     
     # Check tree collisions (block movement, handled in movement code)
@@ -536,21 +1063,24 @@ def handleScrolling(app):
     targetY = CANVAS_HEIGHT * 0.65
     
     if app.playerY < targetY and not app.isHopping:
-        scrollAmount = targetY - app.playerY
-        
-        # Scroll all lanes down
-        for lane in app.lanes:
-            lane['y'] += scrollAmount
-        
-        # Scroll all coins down
-        for coin in app.coins:
-            coin['y'] += scrollAmount
-            coin['laneY'] += scrollAmount
+        scrollWorld(app, targetY - app.playerY)
         
         # Move player to target position
         app.playerY = targetY
         app.playerTargetY = targetY
-        app.scrollOffset += scrollAmount
+
+def scrollWorld(app, scrollAmount):
+    """Move all lanes and coins down the screen by scrollAmount."""
+    # Scroll all lanes down
+    for lane in app.lanes:
+        lane['y'] += scrollAmount
+    
+    # Scroll all coins down
+    for coin in app.coins:
+        coin['y'] += scrollAmount
+        coin['laneY'] += scrollAmount
+    
+    app.scrollOffset += scrollAmount
 
 def generateNewLanes(app):
     """Generate new lanes at the top as needed."""
@@ -558,7 +1088,8 @@ def generateNewLanes(app):
     if not app.lanes:
         return
     
-    topLaneY = min(lane['y'] for lane in app.lanes)
+    # Lanes are stored bottom to top, so the last one is the topmost
+    topLaneY = app.lanes[-1]['y']
     
     # Generate new lanes above the visible area
     while topLaneY > -LANE_HEIGHT:
@@ -567,16 +1098,51 @@ def generateNewLanes(app):
 
 def cleanupOldLanes(app):
     """Remove lanes that have scrolled off the bottom."""
-    app.lanes = [lane for lane in app.lanes if lane['y'] < CANVAS_HEIGHT + LANE_HEIGHT]
+    # Lanes are stored bottom to top, so only the first few can be off screen
+    lanes = app.lanes
+    gone = 0
+    while gone < len(lanes) and lanes[gone]['y'] >= CANVAS_HEIGHT + LANE_HEIGHT:
+        gone += 1
+    if gone:
+        app.lanes = lanes[gone:]
+
+def rebaseCoordinates(app):
+    """Move the world origin and clocks back so a long run matches a fresh one.
+    
+    Only world coordinates and frame numbers change; nothing on screen moves."""
+    # Whole lanes only, so every lane and coin keeps its exact position
+    shift = app.scrollOffset - app.scrollOffset % LANE_HEIGHT
+    app.scrollOffset -= shift
+    app.scrollRebased += shift
+    app.furthestProgress += shift
+    
+    # Animations only depend on the phase within a turn
+    app.waterPhase %= 2 * math.pi
+    app.coinPhase %= 2 * math.pi
+    
+    # Train frames count from now (a uniform shift keeps the heap valid)
+    frames = app.frame
+    app.frame = 0
+    app.trainEvents = [(frame - frames, row, event) for frame, row, event in app.trainEvents]
+    for lane in app.lanes:
+        if lane['type'] == RAIL:
+            lane['trainArrival'] -= frames
+            lane['trainExit'] -= frames
 
 def updateDifficulty(app):
     """Increase difficulty as score increases."""
-    app.difficultyMultiplier = 1.0 + (app.score / 100) * 0.5
-    app.difficultyMultiplier = min(app.difficultyMultiplier, 3.0)  # Cap at 3x
+    app.difficultyMultiplier = getDifficulty(app.score)
 
-def gameOver(app):
-    """Handle game over state."""
+def gameOver(app, cause):
+    """Handle game over state (cause is one of DEATH_CAUSES)."""
     app.gameState = 'gameOver'
+    app.deathCause = cause
+    app.counters[COUNT_GAMES] += 1
+    app.counters[COUNT_DEATHS + DEATH_CAUSES.index(cause)] += 1
+    observe(app.sessionHistogram, time.perf_counter() - app.gameStartTime)
+    observe(app.scoreHistogram, app.score)
+    if app.eventHandlers[EVENT_DEATH]:
+        publish(app, EVENT_DEATH, cause)
     if app.score > app.highScore:
         app.highScore = app.score
 
@@ -586,11 +1152,13 @@ def gameOver(app):
 def onKeyPress(app, key):
     if app.gameState == 'gameOver':
         if key == 'space':
-            resetGame(app)
+            resetGame(app, app.ghostSeed)
         return
     
     if app.isHopping:
         return  # Don't allow input during hop
+    if key in KEY_CODES:
+        app.inputLog += INPUT_RECORD.pack(app.runFrames, KEY_CODES[key])
     
     # Movement
     newX = app.playerX
@@ -605,9 +1173,13 @@ def onKeyPress(app, key):
         if newWorldY < app.furthestProgress:
             app.furthestProgress = newWorldY
             app.score += 1
+            if app.eventHandlers[EVENT_ROW_PASSED]:
+                publish(app, EVENT_ROW_PASSED, newY)
             # Update high score
             if app.score > app.highScore:
                 app.highScore = app.score
+                if app.eventHandlers[EVENT_NEW_BEST]:
+                    publish(app, EVENT_NEW_BEST, app.score)
     elif key in ['down', 's', 'S']:
         newY += GRID_SIZE
     elif key in ['left', 'a', 'A']:
@@ -649,6 +1221,285 @@ def canMoveTo(app, x, y):
     
     return True
 
+# ============================================================================
+# GHOST RUNS
+# ============================================================================
+def startGhostRun(app):
+    """Start recording this run and load earlier runs on the same seed."""
+    app.ghostStart = app.ghostLastPosition = getGhostPosition(app)
+    app.ghostTrack = bytearray(GHOST_HEADER.pack(GHOST_MAGIC, app.seed, 0, *app.ghostStart))
+    app.ghostFrames = 0
+    app.ghosts = loadGhosts(app.seed) if app.ghostSeed is not None else []
+    app.ghostPositions = []  # World positions of the ghosts this frame
+
+def getGhostPosition(app):
+    """Player position in world coordinates (unaffected by scrolling or rebasing)."""
+    return round(app.playerX), round(app.playerY - app.scrollOffset - app.scrollRebased)
+
+def updateGhosts(app):
+    """Append this frame to the recording and step every ghost one frame."""
+    if app.ghostSeed is None:
+        return
+    
+    x, worldY = getGhostPosition(app)
+    lastX, lastY = app.ghostLastPosition
+    dx = x - lastX
+    dy = worldY - lastY
+    if GHOST_ESCAPE < dx <= 127 and -128 <= dy <= 127:
+        app.ghostTrack += GHOST_DELTA.pack(dx, dy)
+    else:
+        app.ghostTrack += GHOST_DELTA.pack(GHOST_ESCAPE, 0)
+        app.ghostTrack += GHOST_POSITION.pack(x, worldY)
+    app.ghostLastPosition = (x, worldY)
+    app.ghostFrames += 1
+    if app.gameState == 'gameOver':
+        saveGhost(app)
+    
+    if app.ghosts:
+        positions = []
+        for ghost in app.ghosts:
+            position = next(ghost, None)
+            if position is not None:
+                positions.append(position)
+        app.ghostPositions = positions
+
+def saveGhost(app):
+    """Store the finished run and prune tracks beyond MAX_GHOSTS."""
+    GHOST_HEADER.pack_into(app.ghostTrack, 0, GHOST_MAGIC, app.seed, app.ghostFrames,
+                           *app.ghostStart)
+    os.makedirs(GHOSTS_PATH, exist_ok=True)
+    path = os.path.join(GHOSTS_PATH, f'seed-{app.seed}-{time.time_ns()}.ghost')
+    with open(path, 'wb') as f:
+        f.write(app.ghostTrack)
+    
+    for oldPath in listGhostFiles(app.seed)[MAX_GHOSTS:]:
+        os.remove(oldPath)
+
+def listGhostFiles(seed):
+    """Ghost files recorded on a seed, newest first (names end in a timestamp)."""
+    paths = glob.glob(os.path.join(GHOSTS_PATH, f'seed-{seed}-*.ghost'))
+    return sorted(paths, reverse=True)
+
+def loadGhosts(seed):
+    """Return a position stream for each of the latest ghosts on a seed."""
+    ghosts = []
+    for path in listGhostFiles(seed)[:MAX_GHOSTS]:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) >= GHOST_HEADER.size and data[:4] == GHOST_MAGIC:
+            ghosts.append(readGhostTrack(data))
+    return ghosts
+
+def readGhostTrack(data):
+    """Decode a ghost file lazily, yielding one (x, worldY) per frame."""
+    _, _, frames, x, worldY = GHOST_HEADER.unpack_from(data)
+    offset = GHOST_HEADER.size
+    for _ in range(frames):
+        dx, dy = GHOST_DELTA.unpack_from(data, offset)
+        offset += GHOST_DELTA.size
+        if dx == GHOST_ESCAPE:
+            x, worldY = GHOST_POSITION.unpack_from(data, offset)
+            offset += GHOST_POSITION.size
+        else:
+            x += dx
+            worldY += dy
+        yield x, worldY
+
+# ============================================================================
+# SAVE / RESTORE
+# ============================================================================
+def saveSnapshot(app):
+    """Serialize the whole game (world, player, train RNG) into a compact bytes blob."""
+    logLane = logObstacle = -1
+    if app.playerOnLog is not None:
+        for i, lane in enumerate(app.lanes):
+            for j, obs in enumerate(lane['obstacles']):
+                if obs is app.playerOnLog:
+                    logLane, logObstacle = i, j
+    
+    parts = [SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC, SNAPSHOT_VERSION, app.seed, GAME_STATES.index(app.gameState),
+        app.score, app.highScore, app.baseSpeed, app.difficultyMultiplier,
+        app.playerX, app.playerY, app.playerTargetX, app.playerTargetY,
+        app.isHopping, app.hopFrame, app.hopHeight, logLane, logObstacle, app.playerFacing,
+        app.scrollOffset, app.scrollRebased, app.furthestProgress, app.waterPhase,
+        app.coinPhase, app.coinCount, app.nextRow, app.frame, app.nextLaneY, len(app.lanes),
+        len(app.coins), app.runFrames,
+        SNAPSHOT_NO_CAUSE if app.deathCause is None else DEATH_CAUSES.index(app.deathCause),
+        len(app.inputLog))]
+    
+    _, state, gauss = app.eventRng.getstate()
+    parts.append(SNAPSHOT_RNG.pack(*state, gauss is not None, gauss or 0.0))
+    
+    packLane = SNAPSHOT_LANE.pack
+    packObstacle = SNAPSHOT_OBSTACLE.pack
+    for lane in app.lanes:
+        parts.append(packLane(
+            LANE_TYPES.index(lane['type']), lane['row'], lane['y'], lane['direction'],
+            lane['speed'], lane['trainWarning'], lane['trainWarningTimer'],
+            lane['trainComing'], lane['trainArrival'], lane['trainExit'],
+            len(lane['obstacles'])))
+        for obs in lane['obstacles']:
+            parts.append(packObstacle(
+                OBSTACLE_TYPES.index(obs['type']), obs['x'], obs['width'], obs['height'],
+                OBSTACLE_COLORS.index(obs['color'])))
+    
+    packCoin = SNAPSHOT_COIN.pack
+    for coin in app.coins:
+        parts.append(packCoin(coin['x'], coin['y'], coin['laneY'], coin['row'], coin['collected']))
+    
+    # The replay record, so a restored game can still be verified (see verify.py)
+    parts.append(app.inputLog)
+    return b''.join(parts)
+
+def restoreSnapshot(app, data):
+    """Restore a game saved by saveSnapshot (the ghost recording restarts here)."""
+    (magic, version, app.seed, gameState, app.score, app.highScore, app.baseSpeed,
+     app.difficultyMultiplier, app.playerX, app.playerY, app.playerTargetX,
+     app.playerTargetY, isHopping, app.hopFrame, app.hopHeight, logLane, logObstacle,
+     app.playerFacing, app.scrollOffset, app.scrollRebased, app.furthestProgress, app.waterPhase,
+     app.coinPhase, app.coinCount, app.nextRow, app.frame, app.nextLaneY,
+     laneCount, coinCount, app.runFrames, deathCause, inputLogSize) = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError('not a snapshot from this version of the game')
+    app.gameState = GAME_STATES[gameState]
+    app.isHopping = bool(isHopping)
+    app.deathCause = None if deathCause == SNAPSHOT_NO_CAUSE else DEATH_CAUSES[deathCause]
+    offset = SNAPSHOT_HEADER.size
+    
+    *state, hasGauss, gauss = SNAPSHOT_RNG.unpack_from(data, offset)
+    offset += SNAPSHOT_RNG.size
+    app.eventRng = random.Random()
+    app.eventRng.setstate((3, tuple(state), gauss if hasGauss else None))
+    
+    unpackLane = SNAPSHOT_LANE.unpack_from
+    unpackObstacle = SNAPSHOT_OBSTACLE.unpack_from
+    app.lanes = []
+    for _ in range(laneCount):
+        (laneType, row, y, direction, speed, trainWarning, trainWarningTimer,
+         trainComing, trainArrival, trainExit, obstacleCount) = unpackLane(data, offset)
+        offset += SNAPSHOT_LANE.size
+        obstacles = []
+        for _ in range(obstacleCount):
+            obsType, x, width, height, color = unpackObstacle(data, offset)
+            offset += SNAPSHOT_OBSTACLE.size
+            obstacles.append({
+                'type': OBSTACLE_TYPES[obsType],
+                'x': x,
+                'width': width,
+                'height': height,
+                'color': OBSTACLE_COLORS[color],
+            })
+        app.lanes.append({
+            'type': LANE_TYPES[laneType],
+            'row': row,
+            'y': y,
+            'direction': direction,
+            'speed': speed,
+            'obstacles': obstacles,
+            'trainWarning': bool(trainWarning),
+            'trainWarningTimer': trainWarningTimer,
+            'trainComing': bool(trainComing),
+            'trainArrival': trainArrival,
+            'trainExit': trainExit,
+        })
+    
+    unpackCoin = SNAPSHOT_COIN.unpack_from
+    app.coins = []
+    for _ in range(coinCount):
+        x, y, laneY, row, collected = unpackCoin(data, offset)
+        offset += SNAPSHOT_COIN.size
+        app.coins.append({'x': x, 'y': y, 'laneY': laneY, 'row': row, 'collected': bool(collected)})
+    app.inputLog = bytearray(data[offset:offset + inputLogSize])
+    
+    app.playerOnLog = app.lanes[logLane]['obstacles'][logObstacle] if logLane >= 0 else None
+    
+    # The train schedule follows from each rail lane's state
+    app.trainEvents = []
+    app.activeTrains = {}
+    for lane in app.lanes:
+        if lane['type'] != RAIL:
+            continue
+        if lane['trainComing']:
+            app.trainEvents.append((lane['trainExit'], lane['row'], 'exit'))
+            app.activeTrains[lane['row']] = lane
+        elif lane['trainWarning']:
+            app.trainEvents.append((lane['trainArrival'], lane['row'], 'arrive'))
+            app.activeTrains[lane['row']] = lane
+        else:
+            warningFrame = lane['trainArrival'] - TRAIN_WARNING_FRAMES + 1
+            app.trainEvents.append((warningFrame, lane['row'], 'warn'))
+    heapq.heapify(app.trainEvents)
+    startGhostRun(app)
+
+# ============================================================================
+# HEADLESS PLAY
+# ============================================================================
+def createHeadlessApp(seed=None):
+    """Create game state without a window (for bots, training and servers)."""
+    app = types.SimpleNamespace()
+    onAppStart(app, seed)
+    return app
+
+def chooseBotKey(app):
+    """Pick a move that looks safe (None = wait), trying forward first."""
+    if app.gameState != 'playing' or app.isHopping:
+        return None
+    
+    # Take the first move that stays safe; failing that, the one safe the longest
+    bestKey, bestFrames = None, -1
+    for key, dx, dy in BOT_MOVES:
+        x = max(PLAYER_SIZE // 2, min(CANVAS_WIDTH - PLAYER_SIZE // 2, app.playerX + dx))
+        y = max(PLAYER_SIZE // 2, min(CANVAS_HEIGHT - PLAYER_SIZE // 2, app.playerY + dy))
+        if key is not None and ((x == app.playerX and y == app.playerY) or
+                                not canMoveTo(app, x, y)):
+            continue
+        arrival = BOT_HOP_FRAMES if key is not None else 0
+        frames = countSafeFrames(app, x, y, arrival, arrival + BOT_LOOKAHEAD)
+        if frames > BOT_LOOKAHEAD:
+            return key
+        if frames > bestFrames:
+            bestKey, bestFrames = key, frames
+    return bestKey
+
+def countSafeFrames(app, x, y, start, end):
+    """Frames from start (up to end, counted from now) that (x, y) looks safe."""
+    lane = getLaneAtY(app, y)
+    if lane is None or lane['type'] == GRASS:
+        return end - start + 1
+    
+    if lane['type'] == RAIL:
+        if lane['trainComing']:
+            return 0
+        untilTrain = nextTrainFrame(app, lane) - app.frame
+        return max(0, min(end + 1, untilTrain) - start)
+    
+    velocity = lane['speed'] * lane['direction']
+    if lane['type'] == WATER:
+        # Land on a log, then don't ride it off the screen
+        if not any(abs(predictObstacleX(obs, velocity, start) - x) < obs['width'] / 2 - BOT_MARGIN
+                   for obs in lane['obstacles']):
+            return 0
+        for frame in range(start, end + 1):
+            drift = x + velocity * (frame - start)
+            if not PLAYER_SIZE // 2 < drift < CANVAS_WIDTH - PLAYER_SIZE // 2:
+                return frame - start
+        return end - start + 1
+    
+    # Road: no car may come near
+    for frame in range(start, end + 1):
+        for obs in lane['obstacles']:
+            clearance = obs['width'] / 2 + PLAYER_SIZE / 2 + BOT_MARGIN
+            if abs(predictObstacleX(obs, velocity, frame) - x) < clearance:
+                return frame - start
+    return end - start + 1
+
+def predictObstacleX(obs, velocity, frames):
+    """Where a wrapping car or log will be after some frames."""
+    width = obs['width']
+    span = CANVAS_WIDTH + 2 * width
+    return (obs['x'] + velocity * frames + width) % span - width
+
 # ============================================================================
 # RENDERING (2.5D Isometric Style)
 # ============================================================================
@@ -666,6 +1517,9 @@ def redrawAll(app):
     # Draw coins (before player so player appears on top)
     drawCoins(app)
     
+    # Draw ghosts of earlier runs under the player
+    drawGhosts(app)
+    
     # Draw player ALWAYS on top of everything (after all lanes/obstacles)
     drawPlayer25D(app)
     
@@ -675,6 +1529,9 @@ def redrawAll(app):
     # Draw game over overlay
     if app.gameState == 'gameOver':
         drawGameOver(app)
+    
+    if app.awaitingFirstStep:
+        recordStartupTime('firstFrame')
 
 def drawCoins(app):
     """Draw all coins with bobbing animation."""
@@ -689,12 +1546,36 @@ def drawCoins(app):
         y = coin['y'] + bobOffset
         
         # Draw coin using sprite
-        try:
-            drawImage(COIN_SPRITE_PATH, x, y - 5, width=30, height=30, align='center')
-        except:
+        if not drawSprite(COIN_SPRITE_PATH, x, y - 5, 30, 30):
             # Fallback to drawn coin if sprite fails
             drawCoin25D(x, y)
 
+def drawGhosts(app):
+    """Draw every on-screen ghost as a single translucent sprite."""
+    if not app.ghostPositions:
+        return
+    scrollOffset = app.scrollOffset + app.scrollRebased
+    for x, worldY in app.ghostPositions:
+        y = worldY + scrollOffset
+        if -PLAYER_SIZE < y < CANVAS_HEIGHT + PLAYER_SIZE:
+            if not drawSprite(CHICKEN_SPRITE_PATH, x, y - 10, 45, 45, GHOST_OPACITY):
+                drawOval(x, y, 28, 28, fill=COLORS['player'], opacity=GHOST_OPACITY)
+
+def drawSprite(path, x, y, width, height, opacity=100):
+    """Draw a sprite centered at (x, y); returns False if it can't be loaded.
+
+    cmu_graphics decodes each image the first time it is drawn. A sprite that
+    fails once is remembered, so later frames don't retry it.
+    """
+    if path in brokenSprites:
+        return False
+    try:
+        drawImage(path, x, y, width=width, height=height, align='center', opacity=opacity)
+    except Exception:
+        brokenSprites.add(path)
+        return False
+    return True
+
 def drawCoin25D(x, y):
     """Draw a 2.5D coin (fallback if sprite not available)."""
     # Shadow
@@ -714,7 +1595,10 @@ def drawCoin25D(x, y):
 
 def drawLane25D(app, lane):
     """Draw a lane with 2.5D depth effect and its obstacles."""
+    if not isLaneVisible(lane):
+        return
     y = lane['y']
+    lod = app.detailLevel
     
     # Draw lane background
     if lane['type'] == GRASS:
@@ -723,38 +1607,47 @@ def drawLane25D(app, lane):
         darkColor = COLORS['grassDark']
         
         drawRect(0, y, CANVAS_WIDTH, LANE_HEIGHT, fill=color)
-        drawRect(0, y + LANE_HEIGHT - 4, CANVAS_WIDTH, 4, fill=darkColor)
+        if lod > LOD_FLAT:
+            drawRect(0, y + LANE_HEIGHT - 4, CANVAS_WIDTH, 4, fill=darkColor)
     
     elif lane['type'] == ROAD:
         drawRect(0, y, CANVAS_WIDTH, LANE_HEIGHT, fill=COLORS['road'])
-        drawRect(0, y + LANE_HEIGHT - 5, CANVAS_WIDTH, 5, fill=COLORS['roadDark'])
-        
-        for i in range(0, CANVAS_WIDTH, 50):
-            drawRect(i + 10, y + LANE_HEIGHT // 2 - 2, 25, 4, fill=COLORS['roadLine'])
+        if lod > LOD_FLAT:
+            drawRect(0, y + LANE_HEIGHT - 5, CANVAS_WIDTH, 5, fill=COLORS['roadDark'])
+            
+            for i in range(0, CANVAS_WIDTH, 50):
+                drawRect(i + 10, y + LANE_HEIGHT // 2 - 2, 25, 4, fill=COLORS['roadLine'])
     
     elif lane['type'] == WATER:
         drawRect(0, y, CANVAS_WIDTH, LANE_HEIGHT, fill=COLORS['water'])
-        drawRect(0, y + LANE_HEIGHT - 5, CANVAS_WIDTH, 5, fill=COLORS['waterDark'])
+        if lod > LOD_FLAT:
+            drawRect(0, y + LANE_HEIGHT - 5, CANVAS_WIDTH, 5, fill=COLORS['waterDark'])
         
-        import math
-        for i in range(0, CANVAS_WIDTH + 20, 25):
-            offset = math.sin(app.waterPhase + i * 0.1) * 3
-            drawOval(i, y + LANE_HEIGHT // 2 + offset, 18, 6, 
-                    fill=None, border=COLORS['waterHighlight'], borderWidth=1, opacity=60)
+        # Ripple highlights
+        if lod == LOD_FULL:
+            import math
+            for i in range(0, CANVAS_WIDTH + 20, 25):
+                offset = math.sin(app.waterPhase + i * 0.1) * 3
+                drawOval(i, y + LANE_HEIGHT // 2 + offset, 18, 6, 
+                        fill=None, border=COLORS['waterHighlight'], borderWidth=1, opacity=60)
     
     elif lane['type'] == RAIL:
         drawRect(0, y, CANVAS_WIDTH, LANE_HEIGHT, fill=COLORS['rail'])
-        drawRect(0, y + LANE_HEIGHT - 5, CANVAS_WIDTH, 5, fill=COLORS['railDark'])
-        
-        for i in range(0, CANVAS_WIDTH, 30):
-            drawRect(i + 2, y + 12, 18, LANE_HEIGHT - 22, fill=COLORS['railDark'])
-            drawRect(i, y + 10, 18, LANE_HEIGHT - 22, fill=COLORS['railTie'])
+        if lod > LOD_FLAT:
+            drawRect(0, y + LANE_HEIGHT - 5, CANVAS_WIDTH, 5, fill=COLORS['railDark'])
+            
+            for i in range(0, CANVAS_WIDTH, 30):
+                if lod >= LOD_NO_SHADOWS:
+                    drawRect(i + 2, y + 12, 18, LANE_HEIGHT - 22, fill=COLORS['railDark'])
+                drawRect(i, y + 10, 18, LANE_HEIGHT - 22, fill=COLORS['railTie'])
         
         drawRect(0, y + 14, CANVAS_WIDTH, 6, fill='silver')
-        drawRect(0, y + 16, CANVAS_WIDTH, 2, fill='gray')
         drawRect(0, y + LANE_HEIGHT - 22, CANVAS_WIDTH, 6, fill='silver')
-        drawRect(0, y + LANE_HEIGHT - 20, CANVAS_WIDTH, 2, fill='gray')
+        if lod > LOD_FLAT:
+            drawRect(0, y + 16, CANVAS_WIDTH, 2, fill='gray')
+            drawRect(0, y + LANE_HEIGHT - 20, CANVAS_WIDTH, 2, fill='gray')
         
+        # Warning lights are gameplay information, so they are drawn at every level
         if lane['trainWarning']:
             flashOn = (lane['trainWarningTimer'] // 4) % 2 == 0
             drawRect(15, y + 5, 8, LANE_HEIGHT - 10, fill='dimGray')
@@ -764,7 +1657,8 @@ def drawLane25D(app, lane):
     
     # Draw obstacles for this lane
     for obs in lane['obstacles']:
-        drawObstacle25D(app, obs, y)
+        if isObstacleVisible(obs):
+            drawObstacle25D(app, obs, y)
 
 def drawObstacle25D(app, obs, laneY):
     """Draw an obstacle with 2.5D isometric style."""
@@ -772,30 +1666,41 @@ def drawObstacle25D(app, obs, laneY):
     baseY = laneY + (LANE_HEIGHT - obs['height']) // 2
     w = obs['width']
     h = obs['height']
+    lod = app.detailLevel
     
+    if lod == LOD_FLAT:
+        drawObstacleFlat(obs, x, baseY, w, h)
+    elif obs['type'] == 'car':
+        drawCar25D(x, baseY, w, h, obs['color'], lod)
+    elif obs['type'] == 'log':
+        drawLog25D(x, baseY, w, h, lod)
+    elif obs['type'] == 'train':
+        drawTrain25D(x, baseY, w, h, lod)
+    elif obs['type'] == 'tree':
+        drawTree25D(x, baseY, w, h, lod)
+
+def drawObstacleFlat(obs, x, baseY, w, h):
+    """Draw an obstacle as a single flat rectangle (lowest detail level)."""
+    color = COLORS[obs['color']]
     if obs['type'] == 'car':
-        drawCar25D(x, baseY, w, h, obs['color'])
+        drawRect(x - w // 2, baseY - 18, w, h, fill=color)
     elif obs['type'] == 'log':
-        drawLog25D(x, baseY, w, h)
+        drawRect(x - w // 2, baseY, w, h - 5, fill=color)
     elif obs['type'] == 'train':
-        drawTrain25D(x, baseY, w, h)
+        drawRect(x - w // 2, baseY - 25, w, h, fill=color)
     elif obs['type'] == 'tree':
-        drawTree25D(x, baseY, w, h)
+        drawRect(x - 18, baseY - 14, 36, h + 14, fill=color)
 
-def drawCar25D(x, baseY, w, h, color):
+def drawCar25D(x, baseY, w, h, colorName, lod=LOD_FULL):
     """Draw a 2.5D car with depth."""
     depth = 18
     
-    colorMap = {
-        COLORS['car1']: COLORS['car1Dark'],
-        COLORS['car2']: COLORS['car2Dark'],
-        COLORS['car3']: COLORS['car3Dark'],
-        COLORS['truck']: COLORS['truckDark'],
-    }
-    darkColor = colorMap.get(color, rgb(100, 100, 100))
+    color = COLORS[colorName]
+    darkColor = COLORS[colorName + 'Dark']
     
     # Shadow
-    drawOval(x, baseY + h + 3, w - 10, 12, fill=COLORS['shadow'], opacity=30)
+    if lod == LOD_FULL:
+        drawOval(x, baseY + h + 3, w - 10, 12, fill=COLORS['shadow'], opacity=30)
     
     # Car bottom (3D side)
     drawRect(x - w // 2 + 3, baseY + h - depth, w - 6, depth, fill=darkColor)
@@ -810,23 +1715,29 @@ def drawCar25D(x, baseY, w, h, color):
     drawRect(x - cabinW // 2 + 2, baseY - depth + cabinH - cabinDepth - 5, cabinW - 4, cabinDepth, fill=darkColor)
     drawRect(x - cabinW // 2, baseY - depth - cabinDepth, cabinW, cabinH, fill=color)
     
+    if lod == LOD_SIMPLE:
+        return
+    
     # Windows
     windowW = cabinW - 10
     windowH = cabinH - 10
     drawRect(x - windowW // 2, baseY - depth - cabinDepth + 5, windowW, windowH, fill=rgb(180, 220, 255))
-    drawRect(x - windowW // 2, baseY - depth - cabinDepth + 5, windowW, 3, fill=rgb(220, 240, 255))
+    if lod == LOD_FULL:
+        drawRect(x - windowW // 2, baseY - depth - cabinDepth + 5, windowW, 3, fill=rgb(220, 240, 255))
     
     # Wheels
     wheelR = 10
     drawOval(x - w // 3, baseY + h - 5, wheelR * 2, wheelR * 1.4, fill=rgb(40, 40, 40))
     drawOval(x + w // 3, baseY + h - 5, wheelR * 2, wheelR * 1.4, fill=rgb(40, 40, 40))
-    drawOval(x - w // 3, baseY + h - 7, wheelR * 1.4, wheelR, fill=rgb(60, 60, 60))
-    drawOval(x + w // 3, baseY + h - 7, wheelR * 1.4, wheelR, fill=rgb(60, 60, 60))
+    if lod == LOD_FULL:
+        drawOval(x - w // 3, baseY + h - 7, wheelR * 1.4, wheelR, fill=rgb(60, 60, 60))
+        drawOval(x + w // 3, baseY + h - 7, wheelR * 1.4, wheelR, fill=rgb(60, 60, 60))
 
-def drawLog25D(x, baseY, w, h):
+def drawLog25D(x, baseY, w, h, lod=LOD_FULL):
     """Draw a 2.5D log with cylindrical appearance."""
     # Shadow in water
-    drawOval(x, baseY + h + 2, w - 5, 10, fill=COLORS['shadow'], opacity=25)
+    if lod == LOD_FULL:
+        drawOval(x, baseY + h + 2, w - 5, 10, fill=COLORS['shadow'], opacity=25)
     
     # Log body
     drawRect(x - w // 2, baseY, w, h - 5, fill=COLORS['log'])
@@ -835,34 +1746,44 @@ def drawLog25D(x, baseY, w, h):
     # Log top surface
     drawOval(x, baseY + 5, w - 4, 14, fill=COLORS['logLight'])
     
+    if lod == LOD_SIMPLE:
+        return
+    
     # Log end caps
     drawOval(x - w // 2 + 8, baseY + h // 2, 14, h - 8, fill=COLORS['logDark'])
     drawOval(x - w // 2 + 8, baseY + h // 2 - 2, 12, h - 12, fill=COLORS['log'])
-    drawOval(x - w // 2 + 8, baseY + h // 2 - 2, 6, (h - 12) // 2, fill=COLORS['logLight'], opacity=60)
+    if lod == LOD_FULL:
+        drawOval(x - w // 2 + 8, baseY + h // 2 - 2, 6, (h - 12) // 2, fill=COLORS['logLight'], opacity=60)
     
     drawOval(x + w // 2 - 8, baseY + h // 2, 14, h - 8, fill=COLORS['logDark'])
     drawOval(x + w // 2 - 8, baseY + h // 2 - 2, 12, h - 12, fill=COLORS['log'])
-    drawOval(x + w // 2 - 8, baseY + h // 2 - 2, 6, (h - 12) // 2, fill=COLORS['logLight'], opacity=60)
+    if lod == LOD_FULL:
+        drawOval(x + w // 2 - 8, baseY + h // 2 - 2, 6, (h - 12) // 2, fill=COLORS['logLight'], opacity=60)
 
-def drawTrain25D(x, baseY, w, h):
+def drawTrain25D(x, baseY, w, h, lod=LOD_FULL):
     """Draw a 2.5D train."""
     depth = 25
     
     # Shadow
-    drawRect(x - w // 2, baseY + h + 2, w, 8, fill=COLORS['shadow'], opacity=30)
+    if lod == LOD_FULL:
+        drawRect(x - w // 2, baseY + h + 2, w, 8, fill=COLORS['shadow'], opacity=30)
     
     # Train body side
     drawRect(x - w // 2, baseY + h - depth, w, depth, fill=COLORS['trainDark'])
     
     # Train body top
     drawRect(x - w // 2, baseY - depth, w, h, fill=COLORS['train'])
-    drawRect(x - w // 2, baseY - depth, w, 5, fill=rgb(130, 130, 140))
+    if lod == LOD_FULL:
+        drawRect(x - w // 2, baseY - depth, w, 5, fill=rgb(130, 130, 140))
     
     # Locomotive front
     locoW = 60
     drawRect(x - w // 2 - 5, baseY - depth - 10, locoW, h + 10, fill=rgb(70, 70, 80))
     drawRect(x - w // 2 - 5, baseY + h - depth - 10, locoW, depth + 10, fill=rgb(50, 50, 60))
     
+    if lod == LOD_SIMPLE:
+        return
+    
     # Cow catcher
     drawPolygon(x - w // 2 - 5, baseY + h,
                 x - w // 2 - 25, baseY + h + 10,
@@ -874,7 +1795,8 @@ def drawTrain25D(x, baseY, w, h):
         winX = x - w // 2 + 80 + i * 50
         if winX < x + w // 2 - 30:
             drawRect(winX, baseY - depth + 8, 30, h - 20, fill=rgb(255, 255, 200))
-            drawRect(winX, baseY - depth + 8, 30, 5, fill=rgb(255, 255, 230))
+            if lod == LOD_FULL:
+                drawRect(winX, baseY - depth + 8, 30, 5, fill=rgb(255, 255, 230))
     
     # Wheels
     for i in range(8):
@@ -882,26 +1804,34 @@ def drawTrain25D(x, baseY, w, h):
         if wheelX < x + w // 2 - 20:
             drawOval(wheelX, baseY + h + 2, 20, 12, fill=rgb(30, 30, 30))
 
-def drawTree25D(x, baseY, w, h):
+def drawTree25D(x, baseY, w, h, lod=LOD_FULL):
     """Draw a 2.5D tree with voxel style."""
     # Shadow
-    drawOval(x, baseY + h + 5, 35, 15, fill=COLORS['shadow'], opacity=35)
+    if lod == LOD_FULL:
+        drawOval(x, baseY + h + 5, 35, 15, fill=COLORS['shadow'], opacity=35)
     
     # Trunk
     trunkW = 14
     trunkH = 25
-    drawRect(x - trunkW // 2 + 3, baseY + h - trunkH + 5, trunkW - 3, trunkH, fill=COLORS['trunkDark'])
+    if lod > LOD_SIMPLE:
+        drawRect(x - trunkW // 2 + 3, baseY + h - trunkH + 5, trunkW - 3, trunkH, fill=COLORS['trunkDark'])
     drawRect(x - trunkW // 2, baseY + h - trunkH, trunkW, trunkH, fill=COLORS['trunk'])
     
     # Foliage layers
     foliageY = baseY + 5
+    if lod == LOD_SIMPLE:
+        drawOval(x, foliageY + 12, 40, 30, fill=COLORS['tree'])
+        drawOval(x, foliageY - 2, 34, 26, fill=COLORS['treeDark'])
+        return
+    
     drawOval(x + 2, foliageY + 18, 38, 28, fill=COLORS['treeDark'])
     drawOval(x, foliageY + 12, 40, 30, fill=COLORS['tree'])
     drawOval(x + 1, foliageY + 3, 32, 24, fill=COLORS['treeDark'])
     drawOval(x, foliageY - 2, 34, 26, fill=COLORS['tree'])
     drawOval(x + 1, foliageY - 10, 22, 18, fill=COLORS['treeDark'])
     drawOval(x, foliageY - 14, 24, 20, fill=rgb(70, 160, 70))
-    drawOval(x - 5, foliageY - 16, 10, 8, fill=rgb(100, 190, 100), opacity=70)
+    if lod == LOD_FULL:
+        drawOval(x - 5, foliageY - 16, 10, 8, fill=rgb(100, 190, 100), opacity=70)
 
 def drawPlayer25D(app):
     """Draw the player character with sprite or 2.5D fallback."""
@@ -913,16 +1843,14 @@ def drawPlayer25D(app):
     hopOffset = -app.hopHeight
     
     # Shadow (shrinks when jumping)
-    shadowScale = 1 - (app.hopHeight / 40)
-    drawOval(x, y + 18, 30 * shadowScale, 12 * shadowScale, fill=COLORS['shadow'], opacity=35)
+    if app.detailLevel == LOD_FULL:
+        shadowScale = 1 - (app.hopHeight / 40)
+        drawOval(x, y + 18, 30 * shadowScale, 12 * shadowScale, fill=COLORS['shadow'], opacity=35)
     
     # Try to draw sprite
-    try:
-        # Flip sprite based on facing direction
-        spriteWidth = 45 if facing == 1 else -45  # Negative width flips horizontally
-        drawImage(CHICKEN_SPRITE_PATH, x, y - 10 + hopOffset, 
-                  width=abs(spriteWidth), height=45, align='center')
-    except:
+    # Flip sprite based on facing direction
+    spriteWidth = 45 if facing == 1 else -45  # Negative width flips horizontally
+    if not drawSprite(CHICKEN_SPRITE_PATH, x, y - 10 + hopOffset, abs(spriteWidth), 45):
         # Fallback to drawn chicken if sprite fails
         drawChickenFallback(app, x, y, facing, hopOffset)
 
@@ -997,128 +1925,304 @@ def drawChickenFallback(app, x, y, facing, hopOffset):
         drawOval(x - 5, footY, 8, 5, fill=rgb(230, 130, 30))
         drawOval(x + 5, footY, 8, 5, fill=rgb(230, 130, 30))
 
+# ============================================================================
+# CACHED UI LAYERS
+# ============================================================================
+# The HUD and the game-over overlay are fixed art (boxes, bevels, icons) plus
+# a few labels. The art is described as shape tuples and painted once into an
+# image, which is then drawn with a single drawImage call. Labels are laid out
+# again only when score, highScore or coinCount change. Without Pillow the
+# shapes are drawn one by one (still without rebuilding them every frame).
+#   ('rect', left, top, width, height, (r, g, b), opacity)
+#   ('oval', centerX, centerY, width, height, (r, g, b), opacity)
+#   ('sprite', path, centerX, centerY, width, height)
+
 def drawUI(app):
     """Draw stylized score, high score, and coin counter."""
+    app.uiDrawCalls = 0
+    app.uiDrawCallsSaved = 0
+    drawUILayer(app, 'hud', getHudArt, getHudLabels)
+
+def drawGameOver(app):
+    """Draw the game over overlay with 2.5D style."""
+    drawUILayer(app, 'gameOver', getGameOverArt, getGameOverLabels)
+
+def drawUILayer(app, name, getArt, getLabels):
+    """Draw a cached layer, rebuilding it when the values it shows change."""
+    values = (app.score, app.highScore, app.coinCount)
+    layer = app.uiLayers.get(name)
+    if layer is None or layer['values'] != values:
+        art = getArt(app)
+        layer = app.uiLayers[name] = {
+            'values': values,
+            'art': art,
+            'image': getLayerImage(art),
+            'labels': getLabels(app),
+        }
     
-    # === SCORE (Center top) ===
+    image = layer['image']
+    if image is not None:
+        picture, left, top, width, height = image
+        drawImage(picture, left, top, width=width, height=height)
+        artCalls = 1
+    else:
+        for shape in layer['art']:
+            if not drawShape(shape):
+                app.uiLayers.pop(name, None)  # A sprite broke; use its fallback next frame
+        artCalls = len(layer['art'])
+    for text, x, y, style in layer['labels']:
+        drawLabel(text, x, y, **style)
+    
+    app.uiDrawCalls += artCalls + len(layer['labels'])
+    app.uiDrawCallsSaved += len(layer['art']) - artCalls
+
+def drawShape(shape):
+    """Draw one art shape directly; returns False if a sprite failed."""
+    kind = shape[0]
+    if kind == 'sprite':
+        return drawSprite(*shape[1:])
+    x, y, width, height, color, opacity = shape[1:]
+    if kind == 'rect':
+        drawRect(x, y, width, height, fill=rgb(*color), opacity=opacity)
+    else:
+        drawOval(x, y, width, height, fill=rgb(*color), opacity=opacity)
+    return True
+
+def getShapeBounds(shape):
+    """(left, top, right, bottom) of an art shape."""
+    if shape[0] == 'sprite':
+        x, y, width, height = shape[2:]
+    else:
+        x, y, width, height = shape[1:5]
+    if shape[0] != 'rect':
+        x -= width / 2
+        y -= height / 2
+    return x, y, x + width, y + height
+
+def getLayerImage(art):
+    """Paint art into one image, cached per art and scale.
+    
+    Returns (image, left, top, width, height) in logical pixels, or None if
+    Pillow (or cmu_graphics' CMUImage) isn't available."""
+    key = (art, DRAW_SCALE)
+    if key not in layerImages:
+        layerImages[key] = paintLayer(art)
+    return layerImages[key]
+
+def paintLayer(art):
+    """Composite art shapes into an image at the screen resolution."""
+    try:
+        from PIL import Image, ImageDraw
+        from cmu_graphics import CMUImage
+    except ImportError:
+        return None
+    
+    bounds = [getShapeBounds(shape) for shape in art]
+    left = math.floor(min(b[0] for b in bounds))
+    top = math.floor(min(b[1] for b in bounds))
+    width = math.ceil(max(b[2] for b in bounds)) - left
+    height = math.ceil(max(b[3] for b in bounds)) - top
+    scale = DRAW_SCALE
+    picture = Image.new('RGBA', (round(width * scale), round(height * scale)))
+    
+    def box(shapeLeft, shapeTop, shapeRight, shapeBottom):
+        return (round((shapeLeft - left) * scale), round((shapeTop - top) * scale),
+                round((shapeRight - left) * scale), round((shapeBottom - top) * scale))
+    
+    for shape, bound in zip(art, bounds):
+        x0, y0, x1, y1 = box(*bound)
+        if shape[0] == 'sprite':
+            sprite = Image.open(shape[1]).convert('RGBA').resize((x1 - x0, y1 - y0))
+            picture.alpha_composite(sprite, (x0, y0))
+            continue
+        color, opacity = shape[5:]
+        layer = Image.new('RGBA', picture.size)
+        draw = ImageDraw.Draw(layer)
+        fill = color + (round(opacity * 255 / 100),)
+        if shape[0] == 'rect':
+            draw.rectangle((x0, y0, x1 - 1, y1 - 1), fill=fill)
+        else:
+            draw.ellipse((x0, y0, x1 - 1, y1 - 1), fill=fill)
+        picture.alpha_composite(layer)
+    return CMUImage(picture), left, top, width, height
+
+def canLoadSprite(path):
+    """Whether a sprite can be drawn (checked once with Pillow when available)."""
+    if path in brokenSprites:
+        return False
+    try:
+        from PIL import Image
+    except ImportError:
+        return True  # drawSprite finds out on the first draw
+    try:
+        with Image.open(path) as image:
+            image.load()
+    except OSError:
+        brokenSprites.add(path)
+        return False
+    return True
+
+def getHudArt(app):
+    """Boxes and icons of the score, high score and coin counter."""
     scoreX = CANVAS_WIDTH // 2
-    scoreY = 8
-    
-    # Score box with 3D effect
-    drawRect(scoreX - 45 + 3, scoreY + 3, 90, 44, fill='black', opacity=30)  # Shadow
-    drawRect(scoreX - 45, scoreY, 90, 44, fill=rgb(255, 255, 255), opacity=95)  # Main
-    drawRect(scoreX - 45, scoreY, 90, 8, fill=rgb(100, 180, 100))  # Top accent
-    drawRect(scoreX - 45, scoreY + 38, 90, 6, fill=rgb(220, 220, 220))  # Bottom edge
-    
-    # Score label and value
-    drawLabel('SCORE', scoreX, scoreY + 14, size=10, bold=True, fill=rgb(100, 100, 100))
-    drawLabel(f'{app.score}', scoreX + 1, scoreY + 30, size=22, bold=True, fill=rgb(80, 80, 80))
-    drawLabel(f'{app.score}', scoreX, scoreY + 29, size=22, bold=True, fill=rgb(50, 50, 50))
-    
-    # === HIGH SCORE (Top right) ===
     highX = CANVAS_WIDTH - 50
-    highY = 8
-    
-    # High score box with 3D effect and gold theme
-    drawRect(highX - 40 + 3, highY + 3, 80, 38, fill='black', opacity=30)  # Shadow
-    drawRect(highX - 40, highY, 80, 38, fill=rgb(255, 235, 180), opacity=95)  # Main
-    drawRect(highX - 40, highY, 80, 6, fill=rgb(255, 200, 80))  # Top accent (gold)
-    drawRect(highX - 40, highY + 32, 80, 6, fill=rgb(220, 190, 140))  # Bottom edge
-    
-    # Trophy icon and high score
-    try:
-        drawImage(TROPHY_SPRITE_PATH, highX - 25, highY + 20, width=28, height=28, align='center')
-    except:
-        # Fallback if sprite fails
-        drawOval(highX - 25, highY + 20, 14, 16, fill=rgb(255, 200, 80))
-    drawLabel(f'{app.highScore}', highX + 8, highY + 20, size=18, bold=True, fill=rgb(140, 100, 20))
-    
-    # === COIN COUNTER (Top left) ===
     coinX = 50
-    coinY = 8
-    
-    # Coin box with 3D effect and yellow theme
-    drawRect(coinX - 40 + 3, coinY + 3, 80, 38, fill='black', opacity=30)  # Shadow
-    drawRect(coinX - 40, coinY, 80, 38, fill=rgb(255, 250, 220), opacity=95)  # Main
-    drawRect(coinX - 40, coinY, 80, 6, fill=rgb(255, 215, 0))  # Top accent (gold coin color)
-    drawRect(coinX - 40, coinY + 32, 80, 6, fill=rgb(230, 220, 180))  # Bottom edge
-    
-    # Coin icon and count
-    # Try to draw mini coin sprite
-    try:
-        drawImage(COIN_SPRITE_PATH, coinX - 22, coinY + 19, width=22, height=22, align='center')
-    except:
-        # Fallback coin icon
-        drawOval(coinX - 22, coinY + 19, 18, 16, fill=rgb(255, 215, 0))
-        drawOval(coinX - 24, coinY + 17, 8, 6, fill=rgb(255, 240, 150), opacity=70)
-        drawLabel('$', coinX - 22, coinY + 19, size=10, bold=True, fill=rgb(200, 160, 30))
+    top = 8
+    art = [
+        # Score box with 3D effect: shadow, main, top accent, bottom edge
+        ('rect', scoreX - 45 + 3, top + 3, 90, 44, (0, 0, 0), 30),
+        ('rect', scoreX - 45, top, 90, 44, (255, 255, 255), 95),
+        ('rect', scoreX - 45, top, 90, 8, (100, 180, 100), 100),
+        ('rect', scoreX - 45, top + 38, 90, 6, (220, 220, 220), 100),
+        # High score box with gold theme
+        ('rect', highX - 40 + 3, top + 3, 80, 38, (0, 0, 0), 30),
+        ('rect', highX - 40, top, 80, 38, (255, 235, 180), 95),
+        ('rect', highX - 40, top, 80, 6, (255, 200, 80), 100),
+        ('rect', highX - 40, top + 32, 80, 6, (220, 190, 140), 100),
+        # Coin box with yellow theme
+        ('rect', coinX - 40 + 3, top + 3, 80, 38, (0, 0, 0), 30),
+        ('rect', coinX - 40, top, 80, 38, (255, 250, 220), 95),
+        ('rect', coinX - 40, top, 80, 6, (255, 215, 0), 100),
+        ('rect', coinX - 40, top + 32, 80, 6, (230, 220, 180), 100),
+    ]
     
-    # Coin count with styling
-    drawLabel(f'×{app.coinCount}', coinX + 12, coinY + 20, size=18, bold=True, fill=rgb(180, 140, 20))
+    # Trophy and coin icons (drawn shapes if the sprites are missing)
+    if canLoadSprite(TROPHY_SPRITE_PATH):
+        art.append(('sprite', TROPHY_SPRITE_PATH, highX - 25, top + 20, 28, 28))
+    else:
+        art.append(('oval', highX - 25, top + 20, 14, 16, (255, 200, 80), 100))
+    if canLoadSprite(COIN_SPRITE_PATH):
+        art.append(('sprite', COIN_SPRITE_PATH, coinX - 22, top + 19, 22, 22))
+    else:
+        art.append(('oval', coinX - 22, top + 19, 18, 16, (255, 215, 0), 100))
+        art.append(('oval', coinX - 24, top + 17, 8, 6, (255, 240, 150), 70))
+    return tuple(art)
 
-def drawGameOver(app):
-    """Draw the game over overlay with 2.5D style."""
-    # Darken background
-    drawRect(0, 0, CANVAS_WIDTH, CANVAS_HEIGHT, fill='black', opacity=50)
-    
-    # Game over box with 3D depth
+def getHudLabels(app):
+    """(text, x, y, style) of the HUD labels for the current values."""
+    scoreX = CANVAS_WIDTH // 2
+    highX = CANVAS_WIDTH - 50
+    coinX = 50
+    top = 8
+    score = f'{app.score}'
+    labels = [
+        ('SCORE', scoreX, top + 14, dict(size=10, bold=True, fill=rgb(100, 100, 100))),
+        (score, scoreX + 1, top + 30, dict(size=22, bold=True, fill=rgb(80, 80, 80))),
+        (score, scoreX, top + 29, dict(size=22, bold=True, fill=rgb(50, 50, 50))),
+        (f'{app.highScore}', highX + 8, top + 20,
+         dict(size=18, bold=True, fill=rgb(140, 100, 20))),
+    ]
+    if COIN_SPRITE_PATH in brokenSprites:
+        labels.append(('$', coinX - 22, top + 19, dict(size=10, bold=True, fill=rgb(200, 160, 30))))
+    labels.append((f'×{app.coinCount}', coinX + 12, top + 20,
+                   dict(size=18, bold=True, fill=rgb(180, 140, 20))))
+    return labels
+
+def isNewBest(app):
+    """Whether the game over screen celebrates a new high score."""
+    return app.score >= app.highScore and app.score > 0
+
+def getGameOverArt(app):
+    """Backdrop, box, coin icon and restart button of the game over overlay."""
     boxWidth = 280
-    boxHeight = 230  # Taller to fit coins
+    boxHeight = 230  # Tall enough for the coins
     boxX = (CANVAS_WIDTH - boxWidth) // 2
     boxY = (CANVAS_HEIGHT - boxHeight) // 2
     boxDepth = 8
-    
-    # Box shadow
-    drawRect(boxX + 6, boxY + 6, boxWidth, boxHeight, fill='black', opacity=40)
-    
-    # Box side (3D depth)
-    drawRect(boxX + boxDepth, boxY + boxHeight, boxWidth, boxDepth, fill=rgb(180, 180, 180))
-    drawRect(boxX + boxWidth, boxY + boxDepth, boxDepth, boxHeight, fill=rgb(200, 200, 200))
-    
-    # Box main
-    drawRect(boxX, boxY, boxWidth, boxHeight, fill=rgb(250, 250, 250))
-    
-    # Top accent bar
-    drawRect(boxX, boxY, boxWidth, 50, fill=rgb(220, 70, 70))
-    drawRect(boxX, boxY + 45, boxWidth, 5, fill=rgb(180, 50, 50))
-    
-    # Game over text
-    drawLabel('GAME OVER', CANVAS_WIDTH // 2 + 2, boxY + 27, size=28, bold=True, fill=rgb(150, 30, 30))
-    drawLabel('GAME OVER', CANVAS_WIDTH // 2, boxY + 25, size=28, bold=True, fill='white')
-    
-    # Score display
-    drawLabel('SCORE', CANVAS_WIDTH // 2, boxY + 70, size=14, fill=rgb(150, 150, 150))
-    drawLabel(f'{app.score}', CANVAS_WIDTH // 2 + 2, boxY + 97, size=36, bold=True, fill=rgb(100, 100, 100))
-    drawLabel(f'{app.score}', CANVAS_WIDTH // 2, boxY + 95, size=36, bold=True, fill=rgb(50, 50, 50))
-    
-    # Coins collected display
-    drawOval(CANVAS_WIDTH // 2 - 35, boxY + 125, 22, 20, fill=rgb(255, 215, 0))
-    drawOval(CANVAS_WIDTH // 2 - 37, boxY + 123, 8, 6, fill=rgb(255, 240, 150), opacity=70)
-    drawLabel('$', CANVAS_WIDTH // 2 - 35, boxY + 125, size=12, bold=True, fill=rgb(200, 160, 30))
-    drawLabel(f'×{app.coinCount}', CANVAS_WIDTH // 2 + 5, boxY + 125, size=18, bold=True, fill=rgb(180, 140, 20))
-    
-    # High score
-    if app.score >= app.highScore and app.score > 0:
-        # Draw trophy sprites on each side of NEW BEST text
-        try:
-            drawImage(TROPHY_SPRITE_PATH, CANVAS_WIDTH // 2 - 75, boxY + 155, width=30, height=30, align='center')
-            drawImage(TROPHY_SPRITE_PATH, CANVAS_WIDTH // 2 + 75, boxY + 155, width=30, height=30, align='center')
-        except:
-            pass
-        drawLabel('NEW BEST!', CANVAS_WIDTH // 2, boxY + 155, size=16, bold=True, fill=rgb(255, 180, 0))
-    else:
-        drawLabel(f'Best: {app.highScore}', CANVAS_WIDTH // 2, boxY + 155, size=16, fill=rgb(120, 120, 120))
-    
+    centerX = CANVAS_WIDTH // 2
+    art = [
+        ('rect', 0, 0, CANVAS_WIDTH, CANVAS_HEIGHT, (0, 0, 0), 50),  # Darken background
+        ('rect', boxX + 6, boxY + 6, boxWidth, boxHeight, (0, 0, 0), 40),  # Box shadow
+        # Box sides (3D depth), box and top accent bar
+        ('rect', boxX + boxDepth, boxY + boxHeight, boxWidth, boxDepth, (180, 180, 180), 100),
+        ('rect', boxX + boxWidth, boxY + boxDepth, boxDepth, boxHeight, (200, 200, 200), 100),
+        ('rect', boxX, boxY, boxWidth, boxHeight, (250, 250, 250), 100),
+        ('rect', boxX, boxY, boxWidth, 50, (220, 70, 70), 100),
+        ('rect', boxX, boxY + 45, boxWidth, 5, (180, 50, 50), 100),
+        # Coin icon
+        ('oval', centerX - 35, boxY + 125, 22, 20, (255, 215, 0), 100),
+        ('oval', centerX - 37, boxY + 123, 8, 6, (255, 240, 150), 70),
+    ]
+    if isNewBest(app) and canLoadSprite(TROPHY_SPRITE_PATH):
+        # Trophies on each side of NEW BEST text
+        art.append(('sprite', TROPHY_SPRITE_PATH, centerX - 75, boxY + 155, 30, 30))
+        art.append(('sprite', TROPHY_SPRITE_PATH, centerX + 75, boxY + 155, 30, 30))
     # Restart button
-    drawRect(boxX + 40, boxY + 180, boxWidth - 80, 35, fill=rgb(100, 180, 100))
-    drawRect(boxX + 40, boxY + 210, boxWidth - 80, 5, fill=rgb(70, 140, 70))
-    drawLabel('Press SPACE to play', CANVAS_WIDTH // 2, boxY + 197, size=14, bold=True, fill='white')
+    art.append(('rect', boxX + 40, boxY + 180, boxWidth - 80, 35, (100, 180, 100), 100))
+    art.append(('rect', boxX + 40, boxY + 210, boxWidth - 80, 5, (70, 140, 70), 100))
+    return tuple(art)
+
+def getGameOverLabels(app):
+    """(text, x, y, style) of the game over labels for the current values."""
+    boxY = (CANVAS_HEIGHT - 230) // 2
+    centerX = CANVAS_WIDTH // 2
+    score = f'{app.score}'
+    labels = [
+        ('GAME OVER', centerX + 2, boxY + 27, dict(size=28, bold=True, fill=rgb(150, 30, 30))),
+        ('GAME OVER', centerX, boxY + 25, dict(size=28, bold=True, fill='white')),
+        ('SCORE', centerX, boxY + 70, dict(size=14, fill=rgb(150, 150, 150))),
+        (score, centerX + 2, boxY + 97, dict(size=36, bold=True, fill=rgb(100, 100, 100))),
+        (score, centerX, boxY + 95, dict(size=36, bold=True, fill=rgb(50, 50, 50))),
+        ('$', centerX - 35, boxY + 125, dict(size=12, bold=True, fill=rgb(200, 160, 30))),
+        (f'×{app.coinCount}', centerX + 5, boxY + 125,
+         dict(size=18, bold=True, fill=rgb(180, 140, 20))),
+    ]
+    if isNewBest(app):
+        labels.append(('NEW BEST!', centerX, boxY + 155,
+                       dict(size=16, bold=True, fill=rgb(255, 180, 0))))
+    else:
+        labels.append((f'Best: {app.highScore}', centerX, boxY + 155,
+                       dict(size=16, fill=rgb(120, 120, 120))))
+    labels.append(('Press SPACE to play', centerX, boxY + 197,
+                   dict(size=14, bold=True, fill='white')))
+    return labels
 
 # ============================================================================
 # RUN THE GAME
 # ============================================================================
+recordStartupTime('import')
+
 def main():
-    runApp()
+    # Tool modules import main; make that this module, not a second copy of it
+    sys.modules.setdefault('main', sys.modules[__name__])
+    
+    # python main.py --ghosts [SEED] races earlier runs on one world
+    ghostSeed = None
+    if '--ghosts' in sys.argv:
+        args = sys.argv[sys.argv.index('--ghosts') + 1:]
+        ghostSeed = int(args[0]) if args and args[0].isdigit() else DEFAULT_GHOST_SEED
+    
+    # python main.py --metrics PORT|FILE exports Prometheus metrics (see metrics.py)
+    metricsTarget = None
+    if '--metrics' in sys.argv[:-1]:
+        metricsTarget = sys.argv[sys.argv.index('--metrics') + 1]
+    
+    # python main.py --analytics FILE adds this session to a heatmap file (see analytics.py)
+    analyticsPath = None
+    if '--analytics' in sys.argv[:-1]:
+        analyticsPath = sys.argv[sys.argv.index('--analytics') + 1]
+    
+    # python main.py --capture FILE [--capture-every N] records the session (see capture.py)
+    captureTarget = None
+    captureEvery = 1
+    if '--capture' in sys.argv[:-1]:
+        captureTarget = sys.argv[sys.argv.index('--capture') + 1]
+    if '--capture-every' in sys.argv[:-1]:
+        captureEvery = int(sys.argv[sys.argv.index('--capture-every') + 1])
+    
+    # python main.py --viewport 1280x720 --scale 1.5 fills a 1920x1080 screen
+    width, height, scale = CANVAS_WIDTH, CANVAS_HEIGHT, DRAW_SCALE
+    if '--viewport' in sys.argv[:-1]:
+        width, height = map(int, sys.argv[sys.argv.index('--viewport') + 1].split('x'))
+    if '--scale' in sys.argv[:-1]:
+        scale = float(sys.argv[sys.argv.index('--scale') + 1])
+    setViewport(width, height, scale)
+    
+    loadGraphics()
+    runApp(width=round(CANVAS_WIDTH * DRAW_SCALE), height=round(CANVAS_HEIGHT * DRAW_SCALE),
+           startupBenchmark='--startup-benchmark' in sys.argv, ghostSeed=ghostSeed,
+           metricsTarget=metricsTarget, analyticsPath=analyticsPath,
+           captureTarget=captureTarget, captureEvery=captureEvery)
 
 if __name__ == '__main__':
     main()
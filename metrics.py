@@ -0,0 +1,115 @@
+"""Prometheus metrics for long-running (kiosk) games.
+
+    python main.py --metrics 9100          # serve http://127.0.0.1:9100/metrics
+    python main.py --metrics game.prom     # rewrite a file every few seconds
+
+The file form suits node_exporter's textfile collector. The game loop only
+bumps preallocated counters and histogram buckets on the app (see main.py);
+this module formats them on a background thread, so exporting never stalls
+a frame.
+"""
+import http.server
+import os
+import threading
+import time
+
+from main import (
+    COUNT_FRAMES, COUNT_COLLISION_CHECKS, COUNT_GAMES, COUNT_DEATHS, DEATH_CAUSES,
+)
+
+FILE_INTERVAL = 5.0  # Seconds between metrics file rewrites
+PREFIX = 'crossy_road'
+
+def formatMetrics(app):
+    """Render the app's metrics in the Prometheus text exposition format."""
+    counters = app.counters
+    lanes = app.lanes
+    lines = []
+
+    def metric(name, kind, help, samples):
+        lines.append(f'# HELP {PREFIX}_{name} {help}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+        for labels, value in samples:
+            lines.append(f'{PREFIX}_{name}{labels} {value}')
+
+    metric('frames_total', 'counter', 'Simulated frames.',
+           [('', counters[COUNT_FRAMES])])
+    metric('collision_checks_total', 'counter', 'Obstacles tested against the player.',
+           [('', counters[COUNT_COLLISION_CHECKS])])
+    metric('games_total', 'counter', 'Finished games.',
+           [('', counters[COUNT_GAMES])])
+    metric('deaths_total', 'counter', 'Deaths by cause.',
+           [(f'{{cause="{cause}"}}', counters[COUNT_DEATHS + i])
+            for i, cause in enumerate(DEATH_CAUSES)])
+    metric('lanes', 'gauge', 'Lanes alive.', [('', len(lanes))])
+    metric('obstacles', 'gauge', 'Obstacles alive.',
+           [('', sum(len(lane['obstacles']) for lane in lanes))])
+    metric('coins', 'gauge', 'Coins alive.', [('', len(app.coins))])
+    metric('detail_level', 'gauge', 'Rendering level of detail (3 = full).',
+           [('', app.detailLevel)])
+    metric('ui_draw_calls', 'gauge', 'HUD and overlay draw calls in the last frame.',
+           [('', app.uiDrawCalls)])
+    metric('ui_draw_calls_saved', 'gauge',
+           'HUD and overlay draw calls saved by cached layers in the last frame.',
+           [('', app.uiDrawCallsSaved)])
+
+    histogram('frame_seconds', 'Time between frames.', app.frameTimeHistogram, metric)
+    histogram('session_seconds', 'Length of finished games.', app.sessionHistogram, metric)
+    histogram('score', 'Score of finished games.', app.scoreHistogram, metric)
+    return '\n'.join(lines) + '\n'
+
+def histogram(name, help, data, metric):
+    """Add a histogram in Prometheus' cumulative-bucket form."""
+    counts = list(data['counts'])  # Copy: the game thread keeps counting
+    samples = []
+    total = 0
+    for bound, count in zip(data['bounds'] + ('+Inf',), counts):
+        total += count
+        samples.append((f'_bucket{{le="{bound}"}}', total))
+    samples.append(('_sum', data['sum']))
+    samples.append(('_count', total))
+    metric(name, 'histogram', help, samples)
+
+def writeMetricsFile(app, path):
+    """Write the metrics atomically, so collectors never read half a file."""
+    tempPath = path + '.tmp'
+    with open(tempPath, 'w') as f:
+        f.write(formatMetrics(app))
+    os.replace(tempPath, path)
+
+def startFileExporter(app, path, interval=FILE_INTERVAL):
+    """Rewrite the metrics file every interval seconds on a daemon thread."""
+    def run():
+        while True:
+            writeMetricsFile(app, path)
+            time.sleep(interval)
+    thread = threading.Thread(target=run, name='metrics-file', daemon=True)
+    thread.start()
+    return thread
+
+def startHttpExporter(app, port, host='127.0.0.1'):
+    """Serve the metrics at http://host:port/metrics on a daemon thread."""
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = formatMetrics(app).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the console
+
+    server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+def startExporter(app, target):
+    """Export to a localhost port (all digits) or else a file path."""
+    if str(target).isdigit():
+        return startHttpExporter(app, int(target))
+    return startFileExporter(app, target)
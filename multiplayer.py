@@ -0,0 +1,691 @@
+"""Server-authoritative multiplayer: up to 8 chickens in one endless world.
+
+    python multiplayer.py server [--host 127.0.0.1] [--port 5113] [--seed N]
+    python multiplayer.py client [--host 127.0.0.1] [--port 5113]
+
+The server runs the lane, obstacle and train simulation once per tick for
+the whole world, then the cheap per-player checks (hops, logs, collisions,
+coins) for each chicken. Players share one screen: the world scrolls with
+the leading chicken, and chickens left behind at the bottom edge are lost.
+When everyone is out, SPACE starts a new world.
+
+Clients get a snapshot over UDP every tick, delta-compressed against the
+last tick they acknowledged:
+- Lanes and coins are sent once, when they appear or disappear. Road and
+  water obstacles move deterministically, so clients simulate them.
+- Train state and players are sent only when they change.
+The latest key press is repeated until the server acknowledges it, and the
+client predicts its own hops so input feels immediate.
+"""
+import argparse
+import select
+import socket
+import struct
+import time
+
+import main
+from main import (
+    CANVAS_WIDTH, CANVAS_HEIGHT, LANE_HEIGHT, PLAYER_SIZE,
+    ROAD, WATER, RAIL, LANE_TYPES, OBSTACLE_TYPES, OBSTACLE_COLORS,
+)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 5113
+TICK_RATE = 30
+MAX_PLAYERS = 8
+CLIENT_TIMEOUT = 5.0  # Seconds of silence before a client is dropped
+HISTORY_TICKS = 64  # Baselines kept for delta compression (about 2 seconds)
+STATS_INTERVAL = 5.0
+MAX_PACKET = 65507
+
+# Message kinds (first byte of every packet)
+MSG_HELLO = b'H'     # client -> server: join
+MSG_WELCOME = b'W'   # server -> client: your player id
+MSG_FULL = b'F'      # server -> client: no free player slot
+MSG_INPUT = b'I'     # client -> server: ack tick, latest input
+MSG_SNAPSHOT = b'S'  # server -> client: world delta
+MSG_BYE = b'B'       # client -> server: leaving
+
+KEYS = (None, 'up', 'down', 'left', 'right', 'space')
+KEY_CODES = {
+    'up': 1, 'w': 1, 'W': 1,
+    'down': 2, 's': 2, 'S': 2,
+    'left': 3, 'a': 3, 'A': 3,
+    'right': 4, 'd': 4, 'D': 4,
+    'space': 5,
+}
+
+WELCOME = struct.Struct('<cB')  # kind, player id
+INPUT = struct.Struct('<cHIIB')  # kind, epoch, ack tick, input seq, key code
+# kind, epoch, tick, base tick (0 = full), input ack, scrollOffset, high score,
+# then counts of removed rows, added lanes, rail updates, removed coins, players
+SNAPSHOT_HEADER = struct.Struct('<cHIIIiHBBBBB')
+ROW = struct.Struct('<I')
+LANE_RECORD = struct.Struct('<IBbdihB')  # row, type, direction, speed, world y, coin x (-1 = none), obstacles
+OBSTACLE_RECORD = struct.Struct('<BdHBB')  # type, x, width, height, color
+RAIL_RECORD = struct.Struct('<IBhd')  # row, flags, warning timer, train x
+PLAYER_RECORD = struct.Struct('<BBfhBHH')  # id, flags, x, y, hop height, score, coins
+
+# Player flags
+ALIVE = 1
+HOPPING = 2
+FACING_RIGHT = 4
+GONE = 128  # Player left the game
+
+# Rail flags
+TRAIN_WARNING = 1
+TRAIN_COMING = 2
+
+# Per-player fields of the single-player game state
+PLAYER_FIELDS = (
+    'playerX', 'playerY', 'playerTargetX', 'playerTargetY', 'isHopping',
+    'hopFrame', 'hopHeight', 'playerOnLog', 'playerFacing', 'score',
+    'furthestProgress', 'coinCount', 'gameState',
+)
+
+# ============================================================================
+# SERVER SIMULATION
+# ============================================================================
+def createWorld(seed=None):
+    """Create a shared world with no players."""
+    app = main.createHeadlessApp(seed)
+    return {
+        'app': app,
+        'tick': 0,
+        'epoch': 1,  # Bumped on every new world so clients resync
+        'players': {},  # id -> player state (PLAYER_FIELDS)
+        'spawn': savePlayer(app),
+        'history': [None] * HISTORY_TICKS,
+    }
+
+def savePlayer(app):
+    """Copy the per-player fields out of the game state."""
+    return {name: getattr(app, name) for name in PLAYER_FIELDS}
+
+def loadPlayer(app, player):
+    """Make a player's fields the current ones, so main's functions act on it."""
+    for name, value in player.items():
+        setattr(app, name, value)
+
+def isAlive(player):
+    return player['gameState'] == 'playing'
+
+def addPlayer(world, playerId):
+    """Spawn a player at the start, or as a spectator if the run is underway."""
+    player = dict(world['spawn'])
+    underway = world['app'].scrollOffset != 0 and any(map(isAlive, world['players'].values()))
+    if underway:
+        player['gameState'] = 'gameOver'
+    world['players'][playerId] = player
+
+def resetWorld(world, seed=None):
+    """Start a new world and respawn everyone."""
+    app = world['app']
+    main.resetGame(app, seed)
+    world['epoch'] = world['epoch'] % 65535 + 1
+    world['spawn'] = savePlayer(app)
+    for playerId in world['players']:
+        world['players'][playerId] = dict(world['spawn'])
+
+def applyInput(world, playerId, key):
+    """Apply a key press from one player."""
+    player = world['players'][playerId]
+    if not isAlive(player):
+        if key == 'space' and not any(map(isAlive, world['players'].values())):
+            resetWorld(world)
+        return
+    if key == 'space':
+        return
+
+    app = world['app']
+    loadPlayer(app, player)
+    main.onKeyPress(app, key)
+    player.update(savePlayer(app))
+
+def stepWorld(world):
+    """Advance the shared world one tick."""
+    app = world['app']
+    world['tick'] += 1
+
+    # Lanes, obstacles and trains are updated once for everyone
+    main.updateLanes(app)
+
+    for player in world['players'].values():
+        if not isAlive(player):
+            continue
+        loadPlayer(app, player)
+        main.updatePlayerHop(app)
+        main.updatePlayerOnLog(app)
+        main.checkCollisions(app)
+        main.checkCoinCollection(app)
+        player.update(savePlayer(app))
+    app.gameState = 'playing'
+
+    scrollWithLeader(world)
+    main.generateNewLanes(app)
+    main.cleanupOldLanes(app)
+    main.cleanupOldCoins(app)
+
+    app.score = max((p['score'] for p in world['players'].values()), default=0)
+    main.updateDifficulty(app)
+
+def scrollWithLeader(world):
+    """Scroll for the furthest chicken; anyone pushed off the bottom is lost."""
+    app = world['app']
+    alive = [p for p in world['players'].values() if isAlive(p)]
+    if not alive:
+        return
+
+    targetY = CANVAS_HEIGHT * 0.65
+    leader = min(alive, key=lambda p: p['playerY'])
+    if leader['playerY'] >= targetY or leader['isHopping']:
+        return
+
+    scrollAmount = targetY - leader['playerY']
+    main.scrollWorld(app, scrollAmount)
+    # Only living chickens ride the scroll; the others are out and not drawn
+    for player in alive:
+        player['playerY'] += scrollAmount
+        player['playerTargetY'] += scrollAmount
+    for player in alive:
+        if player['playerY'] > CANVAS_HEIGHT - PLAYER_SIZE // 2:
+            player['gameState'] = 'gameOver'
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+def captureState(world):
+    """Record what clients need to know about this tick (once per tick)."""
+    app = world['app']
+    state = {
+        'tick': world['tick'],
+        'epoch': world['epoch'],
+        'lanes': {lane['row']: lane for lane in app.lanes},
+        'rails': {},
+        'coins': {coin['row']: coin for coin in app.coins},
+        'players': {},
+        'encodedLanes': {},  # Filled lazily, shared by all clients this tick
+    }
+    for lane in app.lanes:
+        if lane['type'] == RAIL and (lane['trainWarning'] or lane['trainComing']):
+            state['rails'][lane['row']] = encodeRail(lane)
+    for playerId, player in world['players'].items():
+        state['players'][playerId] = encodePlayer(playerId, player)
+
+    world['history'][world['tick'] % HISTORY_TICKS] = state
+    return state
+
+def encodeRail(lane):
+    """Pack a rail lane's train state."""
+    flags = (TRAIN_WARNING if lane['trainWarning'] else 0) | (TRAIN_COMING if lane['trainComing'] else 0)
+    trainX = 0.0
+    for obs in lane['obstacles']:
+        if obs['type'] == 'train':
+            trainX = obs['x']
+    return RAIL_RECORD.pack(lane['row'], flags, lane['trainWarningTimer'], trainX)
+
+def encodePlayer(playerId, player):
+    """Pack one player's visible state."""
+    flags = ((ALIVE if isAlive(player) else 0) |
+             (HOPPING if player['isHopping'] else 0) |
+             (FACING_RIGHT if player['playerFacing'] > 0 else 0))
+    y = max(-32768, min(32767, round(player['playerY'])))  # Fits the record's 'h'
+    return PLAYER_RECORD.pack(playerId, flags, player['playerX'], y,
+                              round(player['hopHeight']), player['score'], player['coinCount'])
+
+def encodeLane(state, row, scrollOffset):
+    """Pack a lane with its current obstacles and coin (cached per tick)."""
+    encoded = state['encodedLanes'].get(row)
+    if encoded is None:
+        lane = state['lanes'][row]
+        coin = state['coins'].get(row)
+        parts = [LANE_RECORD.pack(
+            row, LANE_TYPES.index(lane['type']), lane['direction'], lane['speed'],
+            round(lane['y'] - scrollOffset), coin['x'] if coin else -1,
+            len(lane['obstacles']))]
+        for obs in lane['obstacles']:
+            parts.append(OBSTACLE_RECORD.pack(
+                OBSTACLE_TYPES.index(obs['type']), obs['x'], obs['width'], obs['height'],
+                OBSTACLE_COLORS.index(obs['color'])))
+        encoded = state['encodedLanes'][row] = b''.join(parts)
+    return encoded
+
+def encodeSnapshot(world, state, client):
+    """Build a snapshot for one client, as a delta from its acknowledged tick."""
+    app = world['app']
+    base = world['history'][client['ack'] % HISTORY_TICKS] if client['ack'] else None
+    if base is not None and (base['tick'] != client['ack'] or base['epoch'] != state['epoch']):
+        base = None
+
+    if base is None:
+        removedRows = []
+        addedRows = list(state['lanes'])
+        rails = list(state['rails'].values())
+        removedCoins = []
+        players = list(state['players'].values())
+    else:
+        removedRows = [row for row in base['lanes'] if row not in state['lanes']]
+        addedRows = [row for row in state['lanes'] if row not in base['lanes']]
+        rails = [record for row, record in state['rails'].items()
+                 if base['rails'].get(row) != record]
+        # Trains that finished since the baseline are sent as cleared
+        rails += [RAIL_RECORD.pack(row, 0, 0, 0.0) for row in base['rails']
+                  if row not in state['rails'] and row in state['lanes']]
+        removedCoins = [row for row in base['coins'] if row not in state['coins']]
+        players = [record for playerId, record in state['players'].items()
+                   if base['players'].get(playerId) != record]
+        players += [PLAYER_RECORD.pack(playerId, GONE, 0, 0, 0, 0, 0)
+                    for playerId in base['players'] if playerId not in state['players']]
+
+    # Counts are single bytes; anything bigger falls back to a full snapshot
+    if max(len(removedRows), len(addedRows), len(rails), len(removedCoins)) > 255:
+        client['ack'] = 0
+        return encodeSnapshot(world, state, client)
+
+    parts = [SNAPSHOT_HEADER.pack(
+        MSG_SNAPSHOT, state['epoch'], state['tick'], base['tick'] if base else 0,
+        client['lastSeq'], round(app.scrollOffset), min(app.highScore, 65535),
+        len(removedRows), len(addedRows), len(rails), len(removedCoins), len(players))]
+    parts += [ROW.pack(row) for row in removedRows]
+    parts += [encodeLane(state, row, app.scrollOffset) for row in addedRows]
+    parts += rails
+    parts += [ROW.pack(row) for row in removedCoins]
+    parts += players
+    return b''.join(parts)
+
+# ============================================================================
+# SERVER LOOP
+# ============================================================================
+def runServer(host=DEFAULT_HOST, port=DEFAULT_PORT, seed=None, quiet=False):
+    """Run the world at TICK_RATE and serve clients until interrupted."""
+    world = createWorld(seed)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    clients = {}  # address -> client record
+
+    if not quiet:
+        print(f'Crossy Road server on {host}:{port} ({TICK_RATE} ticks/s, up to {MAX_PLAYERS} players)')
+
+    tickLength = 1 / TICK_RATE
+    nextTick = time.perf_counter()
+    nextStats = nextTick + STATS_INTERVAL
+    tickTime = 0.0
+    try:
+        while True:
+            timeout = max(0.0, nextTick - time.perf_counter())
+            if select.select([sock], [], [], timeout)[0]:
+                receiveAll(sock, world, clients)
+
+            now = time.perf_counter()
+            if now < nextTick:
+                continue
+            # Skip ticks we can't catch up on instead of running them in a burst
+            nextTick = max(nextTick + tickLength, now - tickLength)
+
+            started = time.perf_counter()
+            dropIdleClients(world, clients, now)
+            stepWorld(world)
+            state = captureState(world)
+            for address, client in clients.items():
+                packet = encodeSnapshot(world, state, client)
+                sock.sendto(packet, address)
+                client['bytesSent'] += len(packet)
+            tickTime += time.perf_counter() - started
+
+            if now >= nextStats:
+                if not quiet:
+                    printServerStats(world, clients, tickTime)
+                for client in clients.values():
+                    client['bytesSent'] = 0
+                tickTime = 0.0
+                nextStats = now + STATS_INTERVAL
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+def receiveAll(sock, world, clients):
+    """Handle every packet waiting on the socket."""
+    while True:
+        try:
+            data, address = sock.recvfrom(MAX_PACKET)
+        except (BlockingIOError, ConnectionResetError):
+            return
+        kind = data[:1]
+        client = clients.get(address)
+
+        if kind == MSG_HELLO:
+            if client is None:
+                client = addClient(world, clients, address)
+            if client is None:
+                sock.sendto(MSG_FULL, address)
+            else:
+                sock.sendto(WELCOME.pack(MSG_WELCOME, client['id']), address)
+
+        elif kind == MSG_INPUT and client is not None and len(data) == INPUT.size:
+            _, epoch, ack, seq, code = INPUT.unpack(data)
+            client['lastSeen'] = time.perf_counter()
+            if epoch == world['epoch']:
+                client['ack'] = max(client['ack'], ack)
+            if seq > client['lastSeq']:
+                client['lastSeq'] = seq
+                if 0 < code < len(KEYS):
+                    applyInput(world, client['id'], KEYS[code])
+
+        elif kind == MSG_BYE and client is not None:
+            removeClient(world, clients, address)
+
+def addClient(world, clients, address):
+    """Give a new client a free player slot, or None if the world is full."""
+    usedIds = {client['id'] for client in clients.values()}
+    freeIds = [i for i in range(1, MAX_PLAYERS + 1) if i not in usedIds]
+    if not freeIds:
+        return None
+    client = {
+        'id': freeIds[0],
+        'ack': 0,  # Latest tick the client confirmed (0 = send everything)
+        'lastSeq': 0,  # Latest input applied
+        'lastSeen': time.perf_counter(),
+        'bytesSent': 0,
+    }
+    clients[address] = client
+    addPlayer(world, client['id'])
+    return client
+
+def removeClient(world, clients, address):
+    client = clients.pop(address)
+    del world['players'][client['id']]
+
+def dropIdleClients(world, clients, now):
+    for address in [a for a, c in clients.items() if now - c['lastSeen'] > CLIENT_TIMEOUT]:
+        removeClient(world, clients, address)
+
+def printServerStats(world, clients, tickTime):
+    """Print tick cost and bandwidth per client for the last interval."""
+    ticks = STATS_INTERVAL * TICK_RATE
+    perClient = [client['bytesSent'] / STATS_INTERVAL / 1024 for client in clients.values()]
+    bandwidth = ', '.join(f'{kbps:.2f}' for kbps in perClient) or '-'
+    print(f'tick {world["tick"]}: {len(clients)} players, '
+          f'{tickTime / ticks * 1000:.3f} ms/tick, KB/s per client: {bandwidth}')
+
+# ============================================================================
+# CLIENT PROTOCOL (works headless; the window below is a thin wrapper)
+# ============================================================================
+def connect(app, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Set up client state on a game app and ask the server for a slot."""
+    app.server = (host, port)
+    app.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    app.sock.setblocking(False)
+    app.playerId = None
+    app.serverTick = 0
+    app.epoch = 0
+    app.netHistory = [None] * HISTORY_TICKS  # (tick, epoch, rails, players) received
+    app.netPlayers = {}  # id -> decoded player record
+    app.inputSeq = 0
+    app.inputKey = 0
+    app.inputAck = 0
+    app.lanes = []
+    app.coins = []
+    app.gameState = 'connecting'
+    app.sock.sendto(MSG_HELLO, app.server)
+
+def pollServer(app):
+    """Apply every packet that has arrived from the server."""
+    while True:
+        try:
+            data, _ = app.sock.recvfrom(MAX_PACKET)
+        except (BlockingIOError, ConnectionResetError):
+            return
+        kind = data[:1]
+        if kind == MSG_WELCOME:
+            app.playerId = WELCOME.unpack(data)[1]
+        elif kind == MSG_FULL:
+            app.gameState = 'full'
+        elif kind == MSG_SNAPSHOT and app.playerId is not None:
+            applySnapshot(app, data)
+
+def sendInput(app, key=None):
+    """Send a key press (or just an ack); unacknowledged input is repeated."""
+    if app.playerId is None:
+        app.sock.sendto(MSG_HELLO, app.server)
+        return
+    if key is not None:
+        app.inputSeq += 1
+        app.inputKey = KEY_CODES[key]
+    code = app.inputKey if app.inputSeq > app.inputAck else 0
+    app.sock.sendto(INPUT.pack(MSG_INPUT, app.epoch, app.serverTick, app.inputSeq, code), app.server)
+
+def disconnect(app):
+    app.sock.sendto(MSG_BYE, app.server)
+    app.sock.close()
+
+def applySnapshot(app, data):
+    """Apply a server snapshot to the client's copy of the world."""
+    (_, epoch, tick, baseTick, inputAck, scrollOffset, highScore, removedCount,
+     addedCount, railCount, coinCount, playerCount) = SNAPSHOT_HEADER.unpack_from(data)
+    sameWorld = epoch == app.epoch
+    if sameWorld and tick <= app.serverTick:
+        return  # Late or duplicate packet
+
+    if baseTick:
+        base = app.netHistory[baseTick % HISTORY_TICKS]
+        if base is None or base[0] != baseTick or base[1] != epoch:
+            return  # Can't decode; the next snapshot will use a newer baseline
+        rails = dict(base[2])
+        players = dict(base[3])
+        # Road and water obstacles move deterministically, so catch them up
+        for _ in range(tick - app.serverTick):
+            for lane in app.lanes:
+                if lane['type'] in (ROAD, WATER):
+                    main.moveLaneObstacles(lane)
+    else:
+        rails = {}
+        players = {}
+        app.lanes = []
+        app.coins = []
+
+    # Scrolling moves everything on screen, including our predicted chicken
+    if sameWorld and baseTick:
+        scrollAmount = scrollOffset - app.scrollOffset
+        app.playerY += scrollAmount
+        app.playerTargetY += scrollAmount
+    app.scrollOffset = scrollOffset
+    app.highScore = highScore
+
+    offset = SNAPSHOT_HEADER.size
+    removedRows = set()
+    for _ in range(removedCount):
+        removedRows.add(ROW.unpack_from(data, offset)[0])
+        offset += ROW.size
+    if removedRows:
+        app.lanes = [lane for lane in app.lanes if lane['row'] not in removedRows]
+        app.coins = [coin for coin in app.coins if coin['row'] not in removedRows]
+
+    for _ in range(addedCount):
+        offset = decodeLane(app, data, offset)
+
+    for _ in range(railCount):
+        row = RAIL_RECORD.unpack_from(data, offset)[0]
+        rails[row] = data[offset:offset + RAIL_RECORD.size]
+        offset += RAIL_RECORD.size
+
+    removedCoins = set()
+    for _ in range(coinCount):
+        removedCoins.add(ROW.unpack_from(data, offset)[0])
+        offset += ROW.size
+    if removedCoins:
+        app.coins = [coin for coin in app.coins if coin['row'] not in removedCoins]
+
+    for _ in range(playerCount):
+        record = PLAYER_RECORD.unpack_from(data, offset)
+        offset += PLAYER_RECORD.size
+        if record[1] & GONE:
+            players.pop(record[0], None)
+        else:
+            players[record[0]] = record
+
+    # Rails with no record have no train
+    rails = {row: record for row, record in rails.items() if RAIL_RECORD.unpack(record)[1]}
+    for lane in app.lanes:
+        lane['y'] = lane['worldY'] + scrollOffset
+        if lane['type'] == RAIL:
+            applyRail(app, lane, rails.get(lane['row']))
+    for coin in app.coins:
+        coin['laneY'] = coin['worldY'] + scrollOffset
+        coin['y'] = coin['laneY'] + LANE_HEIGHT // 2
+
+    app.netHistory[tick % HISTORY_TICKS] = (tick, epoch, rails, players)
+    app.serverTick = tick
+    app.epoch = epoch
+    app.inputAck = inputAck
+    app.netPlayers = players
+    reconcilePlayer(app, players.get(app.playerId), resync=not (sameWorld and baseTick))
+
+def decodeLane(app, data, offset):
+    """Add a lane (and its coin) from a snapshot; returns the new offset."""
+    row, laneType, direction, speed, worldY, coinX, obstacleCount = LANE_RECORD.unpack_from(data, offset)
+    offset += LANE_RECORD.size
+    obstacles = []
+    for _ in range(obstacleCount):
+        obsType, x, width, height, color = OBSTACLE_RECORD.unpack_from(data, offset)
+        offset += OBSTACLE_RECORD.size
+        obstacles.append({
+            'type': OBSTACLE_TYPES[obsType],
+            'x': x,
+            'width': width,
+            'height': height,
+            'color': OBSTACLE_COLORS[color],
+        })
+
+    # A lane we already have is replaced by the newer copy
+    app.lanes = [lane for lane in app.lanes if lane['row'] != row]
+    app.coins = [coin for coin in app.coins if coin['row'] != row]
+    app.lanes.append({
+        'type': LANE_TYPES[laneType],
+        'row': row,
+        'y': worldY + app.scrollOffset,
+        'worldY': worldY,
+        'direction': direction,
+        'speed': speed,
+        'obstacles': obstacles,
+        'trainWarning': False,
+        'trainWarningTimer': 0,
+        'trainComing': False,
+    })
+    if coinX >= 0:
+        app.coins.append({
+            'x': coinX,
+            'y': 0,  # Set from worldY after scrolling
+            'laneY': 0,
+            'worldY': worldY,
+            'row': row,
+            'collected': False,
+        })
+    return offset
+
+def applyRail(app, lane, record):
+    """Set a rail lane's warning and train from the server's state."""
+    if record is None:
+        flags, timer, trainX = 0, 0, 0.0
+    else:
+        _, flags, timer, trainX = RAIL_RECORD.unpack(record)
+    lane['trainWarning'] = bool(flags & TRAIN_WARNING)
+    lane['trainWarningTimer'] = timer
+    lane['trainComing'] = bool(flags & TRAIN_COMING)
+    lane['obstacles'] = []
+    if lane['trainComing']:
+        lane['obstacles'].append({
+            'type': 'train', 'x': trainX, 'width': 350, 'height': 45, 'color': 'train',
+        })
+
+def reconcilePlayer(app, record, resync):
+    """Adopt the server's view of our chicken once our input is acknowledged."""
+    if record is None:
+        return
+    _, flags, x, y, hopHeight, score, coins = record
+    app.score = score
+    app.coinCount = coins
+    app.gameState = 'playing' if flags & ALIVE else 'gameOver'
+
+    # While an input is in flight, keep the locally predicted hop
+    if app.inputSeq > app.inputAck and not resync:
+        return
+    app.playerX = x
+    app.playerY = y
+    app.hopHeight = hopHeight
+    app.isHopping = bool(flags & HOPPING)
+    app.playerFacing = 1 if flags & FACING_RIGHT else -1
+    if not app.isHopping:
+        app.playerTargetX = x
+        app.playerTargetY = y
+
+# ============================================================================
+# CLIENT WINDOW (cmu_graphics callbacks, used by `python multiplayer.py client`)
+# ============================================================================
+def onAppStart(app, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    main.onAppStart(app)
+    connect(app, host, port)
+
+def onStep(app):
+    main.updateDetailGovernor(app)
+    pollServer(app)
+    app.waterPhase += 0.1
+    app.coinPhase += 0.15
+    if app.gameState == 'playing':
+        main.updatePlayerHop(app)  # Prediction between snapshots
+    sendInput(app)
+
+def onKeyPress(app, key):
+    if key not in KEY_CODES:
+        return
+    if app.gameState == 'playing' and key != 'space' and not app.isHopping:
+        # Predict the hop locally; the server has the final say
+        score = app.score
+        main.onKeyPress(app, key)
+        app.score = score
+    sendInput(app, key)
+
+def redrawAll(app):
+    main.drawRect(0, 0, CANVAS_WIDTH, CANVAS_HEIGHT, fill=main.rgb(135, 206, 235))
+    if app.gameState in ('connecting', 'full'):
+        message = 'Server is full' if app.gameState == 'full' else 'Connecting...'
+        main.drawLabel(message, CANVAS_WIDTH // 2, CANVAS_HEIGHT // 2, size=20, bold=True)
+        return
+
+    for lane in sorted(app.lanes, key=lambda l: l['y']):
+        main.drawLane25D(app, lane)
+    main.drawCoins(app)
+    drawOtherPlayers(app)
+    if app.gameState == 'playing':
+        main.drawPlayer25D(app)
+    main.drawUI(app)
+    if app.gameState == 'gameOver':
+        main.drawGameOver(app)
+
+def drawOtherPlayers(app):
+    """Draw the other chickens with a player number above each."""
+    for playerId, flags, x, y, hopHeight, score, coins in app.netPlayers.values():
+        if playerId == app.playerId or not flags & ALIVE:
+            continue
+        if not main.drawSprite(main.CHICKEN_SPRITE_PATH, x, y - 10 - hopHeight, 45, 45):
+            main.drawOval(x, y - hopHeight, 28, 28, fill=main.COLORS['player'])
+        main.drawLabel(f'P{playerId}', x, y - 40 - hopHeight, size=11, bold=True, fill='white')
+
+def runClient(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    main.loadGraphics()
+    import cmu_graphics
+    globals()['app'] = cmu_graphics.app  # runApp expects 'app' in the script's globals
+    cmu_graphics.runApp(width=CANVAS_WIDTH, height=CANVAS_HEIGHT, host=host, port=port)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('mode', choices=['server', 'client'])
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--seed', type=int, default=None, help='world seed (server only)')
+    args = parser.parse_args()
+    if args.mode == 'server':
+        runServer(args.host, args.port, args.seed)
+    else:
+        runClient(args.host, args.port)
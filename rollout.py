@@ -0,0 +1,205 @@
+"""Headless games on many cores, batched through shared memory.
+
+    with RolloutPool(numEnvs=64, workers=4) as pool:
+        grid, player = pool.reset()
+        while training:
+            grid, player, reward, done, score = pool.step(actions)
+
+    python rollout.py [--envs 64] [--workers 4] [--steps 2000]   # benchmark
+
+Each worker process runs a slice of the environments (env.CrossyRoadEnv).
+Observations, rewards, done flags and actions all live in one shared memory
+block: the environments observe straight into their rows of it, and the
+arrays the pool returns are NumPy views of it, so nothing is pickled or
+copied between processes. The views are overwritten by the next step();
+copy them if you need to keep them.
+
+Finished games restart right away with the next seed, so the observation
+in a row where done is set is the first one of the new game; score holds
+the final score of the game that ended. Environment i plays seeds
+seed + i, seed + i + numEnvs, seed + i + 2 * numEnvs, ...
+
+The only synchronization is a pair of events per worker for each batch.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from env import CrossyRoadEnv, GRID_SHAPE, PLAYER_SHAPE, NOOP, UP, DOWN, LEFT, RIGHT
+
+# Worker commands
+STEP = 0
+RESET = 1
+CLOSE = 2
+
+def sharedLayout(numEnvs, workers):
+    """(name, dtype, shape) of every array in the shared block."""
+    return (
+        ('grid', np.int8, (numEnvs,) + GRID_SHAPE),
+        ('player', np.int16, (numEnvs,) + PLAYER_SHAPE),
+        ('reward', np.float32, (numEnvs,)),
+        ('done', np.bool_, (numEnvs,)),
+        ('score', np.int32, (numEnvs,)),
+        ('action', np.int8, (numEnvs,)),
+        ('command', np.int8, (workers,)),
+    )
+
+def sharedSize(numEnvs, workers):
+    """Bytes needed for sharedLayout (each array 8-byte aligned)."""
+    size = 0
+    for _, dtype, shape in sharedLayout(numEnvs, workers):
+        size += -size % 8 + int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return size
+
+def sharedArrays(buffer, numEnvs, workers):
+    """NumPy views of the shared block, by name."""
+    arrays = {}
+    offset = 0
+    for name, dtype, shape in sharedLayout(numEnvs, workers):
+        offset += -offset % 8
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += arrays[name].nbytes
+    return arrays
+
+def runWorker(blockName, numEnvs, workers, worker, first, stop, seed, frameSkip, go, ready):
+    """Worker process loop: run environments first..stop-1 on command."""
+    block = shared_memory.SharedMemory(name=blockName)
+    arrays = sharedArrays(block.buf, numEnvs, workers)
+    grid, player = arrays['grid'], arrays['player']
+    reward, done, score, action = arrays['reward'], arrays['done'], arrays['score'], arrays['action']
+
+    # Each environment observes straight into its own rows of the block
+    envs = {}
+    for i in range(first, stop):
+        env = CrossyRoadEnv(frameSkip, copy=False)
+        env.grid = grid[i]
+        env.player = player[i]
+        envs[i] = env
+    episodes = dict.fromkeys(envs, 0)
+
+    while True:
+        go.wait()
+        go.clear()
+        command = arrays['command'][worker]
+        if command == CLOSE:
+            break
+        for i, env in envs.items():
+            if command == RESET:
+                episodes[i] = 0
+                env.reset(seed + i)
+                reward[i] = 0.0
+                done[i] = False
+                continue
+            _, reward[i], done[i], info = env.step(action[i])
+            if done[i]:
+                score[i] = info['score']
+                episodes[i] += 1
+                env.reset(seed + i + episodes[i] * numEnvs)
+        ready.set()
+
+    # Views have to go before the block can be closed
+    del grid, player, reward, done, score, action, arrays, envs
+    block.close()
+
+class RolloutPool:
+    """numEnvs headless games split over worker processes, batched in shared memory."""
+
+    def __init__(self, numEnvs, workers=None, frameSkip=1, seed=0):
+        workers = min(numEnvs, workers or os.cpu_count() or 1)
+        self.numEnvs = numEnvs
+        self.block = shared_memory.SharedMemory(create=True, size=sharedSize(numEnvs, workers))
+        self.arrays = sharedArrays(self.block.buf, numEnvs, workers)
+
+        self.workers = []
+        for worker in range(workers):
+            first = worker * numEnvs // workers
+            stop = (worker + 1) * numEnvs // workers
+            go = multiprocessing.Event()
+            ready = multiprocessing.Event()
+            process = multiprocessing.Process(
+                target=runWorker, name=f'rollout-{worker}', daemon=True,
+                args=(self.block.name, numEnvs, workers, worker, first, stop,
+                      seed, frameSkip, go, ready))
+            process.start()
+            self.workers.append((process, go, ready))
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reset(self):
+        """Start every game over; returns (grid, player) views."""
+        self._run(RESET)
+        return self.arrays['grid'], self.arrays['player']
+
+    def step(self, actions):
+        """Apply one action per environment; returns (grid, player, reward, done, score) views."""
+        self.arrays['action'][:] = actions
+        self._run(STEP)
+        arrays = self.arrays
+        return arrays['grid'], arrays['player'], arrays['reward'], arrays['done'], arrays['score']
+
+    def _run(self, command):
+        """Have every worker run command and wait until all are finished."""
+        self.arrays['command'][:] = command
+        for _, go, _ in self.workers:
+            go.set()
+        for process, _, ready in self.workers:
+            while not ready.wait(1.0):
+                if not process.is_alive():
+                    raise RuntimeError(f'{process.name} exited with code {process.exitcode}')
+            ready.clear()
+
+    def close(self):
+        """Stop the workers and free the shared block."""
+        if self.closed:
+            return
+        self.closed = True
+        self.arrays['command'][:] = CLOSE
+        for process, go, _ in self.workers:
+            go.set()
+        for process, _, _ in self.workers:
+            process.join(5.0)
+            if process.is_alive():
+                process.terminate()
+        self.arrays = None  # Views have to go before the block can be closed
+        self.block.close()
+        self.block.unlink()
+
+def randomActions(rng, numEnvs):
+    """Mostly-forward random actions for benchmarking."""
+    return rng.choice((NOOP, UP, DOWN, LEFT, RIGHT), size=numEnvs, p=(0.3, 0.4, 0.1, 0.1, 0.1))
+
+def benchmark(numEnvs, workers, steps, seed=0):
+    """Environment steps per second for a pool with this many workers."""
+    rng = np.random.default_rng(seed)
+    with RolloutPool(numEnvs, workers, seed=seed) as pool:
+        pool.reset()
+        episodes = 0
+        started = time.perf_counter()
+        for _ in range(steps):
+            _, _, _, done, _ = pool.step(randomActions(rng, numEnvs))
+            episodes += int(done.sum())
+        elapsed = time.perf_counter() - started
+    return numEnvs * steps / elapsed, episodes
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark shared-memory rollout workers.')
+    parser.add_argument('--envs', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--steps', type=int, default=2000)
+    args = parser.parse_args()
+
+    base = None
+    for workers in sorted({1, args.workers}):
+        rate, episodes = benchmark(args.envs, workers, args.steps)
+        base = base or rate
+        print(f'{workers:3} workers: {rate:9.0f} env steps/s '
+              f'({rate / base:.2f}x, {episodes} games finished)')
@@ -0,0 +1,162 @@
+"""Soak test: a bot plays millions of headless frames while we watch for rot.
+
+    python soak.py [--frames 1000000] [--seed 0] [--report 100000]
+                   [--rebase-every FRAMES] [--no-tracemalloc]
+
+Every report prints traced memory, live object counts, the time per frame
+and the float precision (ulp) of the largest coordinate in play. Each report
+also checks that rebasing coordinates changes nothing: it branches the game,
+rebases one copy, and plays both on for REBASE_CHECK_FRAMES.
+
+At the end, the last interval is compared with the first. A healthy run has
+flat memory, object counts and frame time.
+"""
+import argparse
+import gc
+import math
+import time
+import tracemalloc
+
+from main import (
+    GRASS, createHeadlessApp, resetGame, onStep, onKeyPress, chooseBotKey,
+    rebaseCoordinates, saveSnapshot, restoreSnapshot,
+)
+
+REBASE_CHECK_FRAMES = 300
+
+def runSoak(frames, seed=0, reportEvery=100000, rebaseEvery=None, traceMemory=True):
+    """Play `frames` frames with the bot, printing a report every reportEvery."""
+    if traceMemory:
+        tracemalloc.start()
+    app = createHeadlessApp(seed)
+    if rebaseEvery:
+        app.rebaseInterval = rebaseEvery
+
+    games = 1
+    rebases = 0
+    longestGame = 0
+    gameFrames = 0
+    worstUlp = 0.0
+    reports = []
+    intervalStart = time.perf_counter()
+    stepTime = 0.0
+
+    print(f'{"frame":>10} {"games":>6} {"memory KB":>10} {"objects":>9} '
+          f'{"us/frame":>9} {"max ulp":>9}  rebase check')
+    for frame in range(1, frames + 1):
+        if app.gameState != 'playing':
+            longestGame = max(longestGame, gameFrames)
+            resetGame(app, seed + games)
+            games += 1
+            gameFrames = 0
+
+        started = time.perf_counter()
+        key = chooseBotKey(app)
+        if key is not None:
+            onKeyPress(app, key)
+        lastFrame = app.frame
+        onStep(app)
+        stepTime += time.perf_counter() - started
+        gameFrames += 1
+        if app.frame < lastFrame:
+            rebases += 1
+
+        if frame % 1000 == 0:
+            worstUlp = max(worstUlp, largestUlp(app))
+
+        if frame % reportEvery == 0:
+            elapsed = time.perf_counter() - intervalStart
+            rebaseOk = checkRebase(app) if app.gameState == 'playing' else None
+            gc.collect()
+            report = {
+                'frame': frame,
+                'memory': tracemalloc.get_traced_memory()[0] / 1024 if traceMemory else 0,
+                'objects': len(gc.get_objects()),
+                'frameTime': stepTime / reportEvery,
+                'ulp': worstUlp,
+                'rebaseOk': rebaseOk,
+            }
+            reports.append(report)
+            print(f'{frame:10} {games:6} {report["memory"]:10.0f} {report["objects"]:9} '
+                  f'{report["frameTime"] * 1e6:9.1f} {worstUlp:9.2g}  '
+                  f'{describeCheck(report["rebaseOk"])}   ({elapsed:.1f}s)')
+            stepTime = 0.0
+            worstUlp = 0.0
+            intervalStart = time.perf_counter()
+
+    longestGame = max(longestGame, gameFrames)
+    print(f'\n{games} games, longest {longestGame} frames, {rebases} rebases')
+    if len(reports) >= 2:
+        summarize(reports[0], reports[-1])
+    return reports
+
+def largestUlp(app):
+    """Spacing between adjacent floats at the largest coordinate in play."""
+    values = [app.scrollOffset, app.furthestProgress, app.waterPhase, app.coinPhase,
+              app.playerX, app.playerY]
+    for lane in app.lanes:
+        values.append(lane['y'])
+        values.extend(obs['x'] for obs in lane['obstacles'])
+    return math.ulp(max(abs(value) for value in values))
+
+def checkRebase(app):
+    """Whether a rebased copy of the game plays out exactly like an untouched one."""
+    snapshot = saveSnapshot(app)
+    plain = createHeadlessApp()
+    rebased = createHeadlessApp()
+    for game in (plain, rebased):
+        restoreSnapshot(game, snapshot)
+        game.rebaseInterval = math.inf
+    rebaseCoordinates(rebased)
+
+    for _ in range(REBASE_CHECK_FRAMES):
+        for game in (plain, rebased):
+            key = chooseBotKey(game)
+            if key is not None:
+                onKeyPress(game, key)
+            onStep(game)
+        if screenState(plain) != screenState(rebased):
+            return False
+    return True
+
+def screenState(app):
+    """Everything that decides what the player sees and what happens next."""
+    lanes = []
+    for lane in app.lanes:
+        trains = () if lane['type'] == GRASS else (
+            lane['trainWarning'], lane['trainWarningTimer'], lane['trainComing'])
+        lanes.append((lane['type'], lane['y'], trains,
+                      tuple(obs['x'] for obs in lane['obstacles'])))
+    coins = tuple((coin['x'], coin['y']) for coin in app.coins)
+    return (app.gameState, app.score, app.coinCount, app.playerX, app.playerY,
+            app.isHopping, tuple(lanes), coins)
+
+def describeCheck(ok):
+    return {True: 'same', False: 'DIFFERENT', None: '-'}[ok]
+
+def summarize(first, last):
+    """Compare the last report with the first."""
+    def growth(name, unit, scale=1):
+        before = first[name] * scale
+        after = last[name] * scale
+        change = (after - before) / before * 100 if before else 0.0
+        print(f'  {name:10} {before:12.1f} -> {after:12.1f} {unit:9} ({change:+.1f}%)')
+
+    print(f'Frames {first["frame"]} -> {last["frame"]}:')
+    if first['memory']:
+        growth('memory', 'KB')
+    growth('objects', 'objects')
+    growth('frameTime', 'us/frame', 1e6)
+    print(f'  {"ulp":10} {first["ulp"]:12.2g} -> {last["ulp"]:12.2g}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless soak test with a bot player.')
+    parser.add_argument('--frames', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', type=int, default=100000, help='frames between reports')
+    parser.add_argument('--rebase-every', type=int, default=None,
+                        help='rebase coordinates every N frames (default: main.REBASE_FRAMES)')
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help='skip memory tracing (about twice as fast)')
+    args = parser.parse_args()
+    runSoak(args.frames, args.seed, args.report, args.rebase_every, not args.no_tracemalloc)
@@ -0,0 +1,27 @@
+import multiplayer
+from main import CANVAS_HEIGHT
+
+def test_scrolling_far_past_a_dead_player_keeps_encoding():
+    world = multiplayer.createWorld(seed=0)
+    multiplayer.addPlayer(world, 1)
+    multiplayer.addPlayer(world, 2)
+    leader, dead = world['players'][1], world['players'][2]
+    dead['gameState'] = 'gameOver'
+    deadY = dead['playerY']
+
+    targetY = CANVAS_HEIGHT * 0.65
+    while world['app'].scrollOffset < 40000:
+        leader['playerY'] = leader['playerTargetY'] = targetY - 50
+        multiplayer.scrollWithLeader(world)
+        multiplayer.captureState(world)
+
+    assert dead['playerY'] == deadY
+    assert multiplayer.isAlive(leader)
+
+def test_encode_player_clamps_y_to_the_record_range():
+    world = multiplayer.createWorld(seed=0)
+    multiplayer.addPlayer(world, 1)
+    player = world['players'][1]
+    player['playerY'] = 100000.0
+    record = multiplayer.PLAYER_RECORD.unpack(multiplayer.encodePlayer(1, player))
+    assert record[3] == 32767
@@ -0,0 +1,58 @@
+import random
+from collections import Counter
+
+import main
+from main import LANE_WEIGHTS, START_ROWS
+
+SEEDS = range(10)
+ROWS = 4000
+
+def runLengths(types):
+    """Count of runs of each length in a sequence of lane types."""
+    runs = Counter()
+    length = 1
+    for previous, current in zip(types, types[1:]):
+        if current == previous:
+            length += 1
+        else:
+            runs[length] += 1
+            length = 1
+    runs[length] += 1
+    return runs
+
+def baselineLaneTypes(rng, count):
+    """Lane types from the original sequential generator (halve a type after two in a row)."""
+    types = []
+    for _ in range(count):
+        weights = LANE_WEIGHTS
+        if len(types) >= 2 and types[-1] == types[-2]:
+            weights = [(t, w // 2 if t == types[-1] else w) for t, w in weights]
+        total = sum(w for _, w in weights)
+        r = rng.randint(1, total)
+        for laneType, weight in weights:
+            r -= weight
+            if r <= 0:
+                types.append(laneType)
+                break
+    return types
+
+def test_lane_types_match_the_sequential_anti_repeat_rule():
+    for seed in SEEDS:
+        final = [main.GRASS] * START_ROWS
+        for row in range(START_ROWS, 1000):
+            final.append(main.applyRepeatRule(seed, row, final[-1], final[-2]))
+        assert [main.getLaneType(seed, row) for row in range(1000)] == final
+
+def test_lane_type_run_lengths_match_the_baseline():
+    runs = Counter()
+    for seed in SEEDS:
+        runs += runLengths([main.getLaneType(seed, row) for row in range(START_ROWS, ROWS)])
+    rng = random.Random(0)
+    baseline = runLengths(baselineLaneTypes(rng, len(SEEDS) * (ROWS - START_ROWS)))
+
+    def longRuns(counts, length):
+        return sum(n for runLength, n in counts.items() if runLength >= length)
+
+    for length in (3, 4, 5):
+        assert 0.75 < longRuns(runs, length) / longRuns(baseline, length) < 1.33
+    assert longRuns(runs, 8) <= 3 * max(1, longRuns(baseline, 8))
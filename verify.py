@@ -0,0 +1,296 @@
+"""Replay verification of submitted scores.
+
+    with VerificationService(workers=4) as service:
+        future = service.submit(encodeSubmission(app))   # after the game ends
+        result = future.result()   # {'ok': ..., 'reason': ..., 'score': ..., ...}
+
+    python verify.py [--runs 200] [--workers 4] [--tamper 0.1]   # benchmark
+    python verify.py FILE...                                      # verify files
+
+A submission is the seed and the game's input log (main.INPUT_RECORD per
+move key the game accepted), plus the claimed length, score, coins and cause
+of death. Worlds and trains are pure functions of the seed, so replaying the
+inputs on a headless game reproduces the run frame for frame. A run passes
+only if every input lands when the game can take it, the player dies on the
+claimed frame, and score, coins and cause match.
+
+Submissions wait in a bounded queue (submit() blocks when it is full) and go
+to the worker processes in batches, so a worker replays many runs per
+round trip and keeps one headless game for all of them.
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import main
+from main import (
+    DEATH_CAUSES, INPUT_RECORD, MOVE_KEYS,
+    createHeadlessApp, resetGame, onStep, onKeyPress, chooseBotKey, setViewport,
+)
+
+SUBMISSION_MAGIC = b'CRV2'
+# magic, seed, viewport width, height, frames, score, coins, DEATH_CAUSES index
+SUBMISSION_HEADER = struct.Struct('<4sqHHIIIB')  # Seeds are 64-bit, as in snapshots
+
+MAX_RUN_FRAMES = 30 * 60 * 60  # An hour of play; longer claims are rejected unplayed
+MAX_VIEWPORT_SIZE = 4096  # Largest viewport width/height replayed (see main.MIN_VIEWPORT_SIZE)
+BATCH_SIZE = 16  # Submissions per worker round trip
+QUEUE_SIZE = 4096  # Submissions waiting before submit() blocks
+
+def encodeSubmission(app):
+    """Binary submission for a finished game."""
+    if app.gameState != 'gameOver':
+        raise ValueError('only finished games can be submitted')
+    if not -2**63 <= app.seed < 2**63:
+        raise ValueError(f'seed {app.seed} does not fit in 64 bits')
+    header = SUBMISSION_HEADER.pack(
+        SUBMISSION_MAGIC, app.seed, main.CANVAS_WIDTH, main.CANVAS_HEIGHT, app.runFrames,
+        app.score, app.coinCount, DEATH_CAUSES.index(app.deathCause))
+    return header + bytes(app.inputLog)
+
+def decodeSubmission(data):
+    """Submission fields as a dict; raises ValueError if malformed."""
+    if len(data) < SUBMISSION_HEADER.size:
+        raise ValueError('truncated header')
+    magic, seed, width, height, frames, score, coins, cause = \
+        SUBMISSION_HEADER.unpack_from(data)
+    if magic != SUBMISSION_MAGIC:
+        raise ValueError('not a submission')
+    if cause >= len(DEATH_CAUSES):
+        raise ValueError(f'unknown cause of death {cause}')
+    if not (main.MIN_VIEWPORT_SIZE <= width <= MAX_VIEWPORT_SIZE and
+            main.MIN_VIEWPORT_SIZE <= height <= MAX_VIEWPORT_SIZE):
+        raise ValueError(f'unsupported viewport {width}x{height}')
+    inputs = memoryview(data)[SUBMISSION_HEADER.size:]
+    if len(inputs) % INPUT_RECORD.size:
+        raise ValueError('truncated input log')
+    return {
+        'seed': seed,
+        'viewport': (width, height),
+        'frames': frames,
+        'score': score,
+        'coins': coins,
+        'cause': DEATH_CAUSES[cause],
+        'inputs': list(INPUT_RECORD.iter_unpack(inputs)),
+    }
+
+def replaySubmission(app, data):
+    """Replay a submission on a headless app and judge it (see module docstring)."""
+    try:
+        claim = decodeSubmission(data)
+    except ValueError as error:
+        return verdict(None, None, f'malformed: {error}')
+    frames = claim['frames']
+    if frames > MAX_RUN_FRAMES:
+        return verdict(claim, None, f'{frames} frames is longer than {MAX_RUN_FRAMES}')
+    inputs = claim['inputs']
+    lastFrame = -1
+    for frame, key in inputs:
+        if frame < lastFrame or frame >= frames or key >= len(MOVE_KEYS):
+            return verdict(claim, None, f'bad input record ({frame}, {key})')
+        lastFrame = frame
+
+    # The world depends on the viewport width (lanes hold more obstacles when wider)
+    if claim['viewport'] != (main.CANVAS_WIDTH, main.CANVAS_HEIGHT):
+        setViewport(*claim['viewport'])
+    resetGame(app, claim['seed'])
+
+    # Step until the next input is due, press it, repeat; then play out to the death
+    for frame, key in inputs:
+        while app.runFrames < frame:
+            onStep(app)
+            if app.gameState != 'playing':
+                return verdict(claim, app, f'died on frame {app.runFrames}, '
+                                           f'before input at frame {frame}')
+        if app.isHopping:
+            return verdict(claim, app, f'input at frame {frame} while hopping')
+        onKeyPress(app, MOVE_KEYS[key])
+    while app.gameState == 'playing' and app.runFrames < frames:
+        onStep(app)
+
+    if app.gameState == 'playing':
+        return verdict(claim, app, f'still alive on frame {frames}')
+    if app.runFrames != frames:
+        return verdict(claim, app, f'died on frame {app.runFrames}, not {frames}')
+    for name, value in (('score', app.score), ('coins', app.coinCount),
+                        ('cause', app.deathCause)):
+        if value != claim[name]:
+            return verdict(claim, app, f'{name} is {value}, not {claim[name]}')
+    return verdict(claim, app, None)
+
+def verdict(claim, app, reason):
+    """Result dict: ok, the reason a run was rejected, and the replayed outcome."""
+    result = {'ok': reason is None, 'reason': reason}
+    if claim is not None:
+        result['seed'] = claim['seed']
+    if app is not None:
+        result.update(frames=app.runFrames, score=app.score, coins=app.coinCount,
+                      cause=app.deathCause)
+    return result
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+workerApp = None  # Each worker replays every run on one headless game
+
+def verifyBatch(batch):
+    """Worker: replay a list of submissions; returns their results in order."""
+    global workerApp
+    if workerApp is None:
+        workerApp = createHeadlessApp(0)
+    results = []
+    for data in batch:
+        # A submission that breaks the game only fails itself, not its batch
+        try:
+            results.append(replaySubmission(workerApp, data))
+        except Exception as error:
+            results.append(verdict(None, None, f'replay failed: {error!r}'))
+            workerApp = createHeadlessApp(0)
+    return results
+
+class VerificationService:
+    """Queue of submissions replayed on a process pool; submit() returns a Future."""
+
+    def __init__(self, workers=None, batchSize=BATCH_SIZE, queueSize=QUEUE_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.batchSize = batchSize
+        self.pool = multiprocessing.Pool(self.workers)
+        self.queue = queue.Queue(queueSize)
+        # Batches handed to the pool but not finished, so the queue is what backs up
+        self.slots = threading.Semaphore(self.workers * 2)
+        self.dispatcher = threading.Thread(target=self._dispatch, name='verify-dispatch',
+                                           daemon=True)
+        self.dispatcher.start()
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, data):
+        """Queue a submission (blocks while the queue is full)."""
+        if self.closed:
+            raise RuntimeError('submit() after close()')
+        future = Future()
+        self.queue.put((bytes(data), future))
+        return future
+
+    def _dispatch(self):
+        """Hand queued submissions to the pool in batches of up to batchSize."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.batchSize:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)  # Stop after this batch
+                    break
+                batch.append(item)
+
+            futures = [future for _, future in batch]
+            self.slots.acquire()
+            self.pool.apply_async(
+                verifyBatch, ([data for data, _ in batch],),
+                callback=lambda results, futures=futures: self._finish(futures, results),
+                error_callback=lambda error, futures=futures: self._fail(futures, error))
+
+    def _finish(self, futures, results):
+        self.slots.release()
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def _fail(self, futures, error):
+        self.slots.release()
+        for future in futures:
+            future.set_exception(error)
+
+    def close(self):
+        """Finish everything queued, then stop the workers."""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.dispatcher.join()
+        self.pool.close()
+        self.pool.join()
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+def playBotRun(app, seed, maxFrames):
+    """Have the bot play one game; returns its submission (None if it outlived maxFrames)."""
+    resetGame(app, seed)
+    while app.gameState == 'playing' and app.runFrames < maxFrames:
+        key = chooseBotKey(app)
+        if key is not None:
+            onKeyPress(app, key)
+        onStep(app)
+    return encodeSubmission(app) if app.gameState == 'gameOver' else None
+
+def tamper(data, rng):
+    """Raise the claimed score by a little, as a cheater would."""
+    data = bytearray(data)
+    fields = list(SUBMISSION_HEADER.unpack_from(data))
+    fields[5] += rng.randint(1, 10)
+    SUBMISSION_HEADER.pack_into(data, 0, *fields)
+    return bytes(data)
+
+def benchmark(runs, workers, tamperRate, seed=0, maxFrames=30 * 60 * 5):
+    """Verify `runs` bot runs (some tampered); prints runs and frames per second."""
+    app = createHeadlessApp(seed)
+    rng = random.Random(seed)
+    submissions = []
+    while len(submissions) < runs:
+        data = playBotRun(app, seed + len(submissions) + rng.randrange(1 << 16), maxFrames)
+        if data is not None:
+            cheated = rng.random() < tamperRate
+            submissions.append((tamper(data, rng) if cheated else data, cheated))
+    frames = sum(SUBMISSION_HEADER.unpack_from(data)[4] for data, _ in submissions)
+
+    started = time.perf_counter()
+    with VerificationService(workers) as service:
+        futures = [service.submit(data) for data, _ in submissions]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    wrong = sum(result['ok'] == cheated for result, (_, cheated) in zip(results, submissions))
+    rejected = sum(not result['ok'] for result in results)
+    print(f'{runs} runs ({frames} frames) on {service.workers} workers in {elapsed:.2f}s: '
+          f'{runs / elapsed:.1f} runs/s, {frames / elapsed:.0f} frames/s, '
+          f'{rejected} rejected, {wrong} misjudged')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verify submitted runs by replaying them.')
+    parser.add_argument('files', nargs='*', help='submission files to verify')
+    parser.add_argument('--runs', type=int, default=200, help='bot runs to benchmark with')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--tamper', type=float, default=0.1,
+                        help='fraction of benchmark runs with an inflated score')
+    args = parser.parse_args()
+
+    if not args.files:
+        benchmark(args.runs, args.workers, args.tamper)
+        sys.exit()
+    with VerificationService(args.workers) as service:
+        futures = []
+        for path in args.files:
+            with open(path, 'rb') as f:
+                futures.append(service.submit(f.read()))
+        for path, future in zip(args.files, futures):
+            result = future.result()
+            status = 'ok' if result['ok'] else f'REJECTED ({result["reason"]})'
+            print(f'{path}: {status}')